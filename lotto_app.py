@@ -1,17 +1,25 @@
 import streamlit as st
-import requests
-import random
 import os
 import json
-import time
+import numpy as np
 import pandas as pd
-from collections import Counter
 import streamlit.components.v1 as components
 import base64
+import threading
 
 import gspread
 from google.oauth2.service_account import Credentials
 
+from lotto_engine import (
+    LottoAI, CombinationTable, GameGenerator, iter_games_parallel,
+    rank_tickets, unrank_tickets, encode_tickets, decode_tickets,
+    mask_numbers, ticket_masks, match_tickets, DrawIndex, FrequencyIndex, GapIndex, CooccurrenceIndex, FILTER_LABELS,
+)
+from lotto_store import (
+    DrawModel, DrawRefresher, DrawStore, HistoryCache, HistoryWriter, PrizeStore, StatsAggregate,
+)
+from lotto_sim import HARD_FILTERS, estimate_filters
+
 # ==========================================
 # [0] PWA 설치형 앱 설정
 # ==========================================
@@ -50,8 +58,16 @@ components.html(f"""
 # ==========================================
 # [1] 구글 스프레드시트 연동
 # ==========================================
+def has_gsheet_secrets() -> bool:
+    """시트 연동 설정이 있는지. secrets.toml 자체가 없어도 예외 없이 False."""
+    try:
+        return "gcp_service_account" in st.secrets and "sheet" in st.secrets
+    except FileNotFoundError:  # StreamlitSecretNotFoundError 포함
+        return False
+
+
 def get_gsheet_client():
-    if "gcp_service_account" not in st.secrets or "sheet" not in st.secrets:
+    if not has_gsheet_secrets():
         return None
     scopes = [
         "https://www.googleapis.com/auth/spreadsheets",
@@ -63,326 +79,248 @@ def get_gsheet_client():
     return gspread.authorize(creds)
 
 
+@st.cache_resource(show_spinner=False)
+def get_history_cache():
+    """프로세스 전체가 함께 쓰는 생성 이력 시트 캐시. 시트 설정이 없으면 None.
+
+    인증과 시트 열기는 첫 동기화 때 하므로, 여기서는 설정 유무만 본다.
+    """
+    if not has_gsheet_secrets():
+        return None
+    return HistoryCache(lambda: get_gsheet_client().open_by_url(st.secrets["sheet"]["url"]).sheet1)
+
+
 def load_history():
+    """생성 이력 레코드 목록. 시트 이력은 캐시에서 읽으므로 다시 그릴 때마다 시트를 받지 않는다."""
     records = []
-    try:
-        gc = get_gsheet_client()
-        if gc:
-            sheet_url = st.secrets["sheet"]["url"]
-            worksheet = gc.open_by_url(sheet_url).sheet1
-            for row in worksheet.get_all_values():
-                if len(row) >= 2:
-                    try:
-                        records.append({
-                            "epsd": int(row[0]),
-                            "games": json.loads(row[1]),
-                        })
-                    except (ValueError, json.JSONDecodeError):
-                        continue
-            return records
-    except Exception as e:
-        st.warning(f"구글 시트 불러오기 실패, 로컬 파일로 대체합니다. ({e})")
+    cache = get_history_cache()
+    if cache is not None:
+        try:
+            return cache.get()
+        except Exception as e:
+            # 한 번이라도 받아 둔 이력이 있으면 그대로 쓰고 다음 동기화 때 다시 시도
+            if cache.version:
+                return cache.records
+            st.warning(f"구글 시트 불러오기 실패, 로컬 파일로 대체합니다. ({e})")
 
     if os.path.exists("lotto_history.jsonl"):
         with open("lotto_history.jsonl", "r", encoding="utf-8") as f:
             for line in f:
                 try:
-                    records.append(json.loads(line))
-                except json.JSONDecodeError:
+                    record = json.loads(line)
+                    records.append({
+                        "epsd": int(record["epsd"]),
+                        "ranks": decode_tickets(record["games"]),
+                    })
+                except (ValueError, KeyError, TypeError, json.JSONDecodeError):
                     continue
     return records
 
 
-def save_history(epsd: int, games: list, retries: int = 3, retry_delay: float = 1.5) -> bool:
-    gc = get_gsheet_client()
-    if gc:
-        sheet_url = st.secrets["sheet"]["url"]
-        row_data = [epsd, json.dumps(games)]
-        for attempt in range(1, retries + 1):
-            try:
-                worksheet = gc.open_by_url(sheet_url).sheet1
-                worksheet.append_row(row_data)
-                last_row = worksheet.get_all_values()[-1]
-                if len(last_row) >= 2 and str(last_row[0]) == str(epsd):
-                    return True
-                raise ValueError(f"검증 실패: 저장된 회차({last_row[0]}) != 요청 회차({epsd})")
-            except Exception as e:
-                if attempt < retries:
-                    time.sleep(retry_delay)
-                else:
-                    st.warning(f"구글 시트 저장 {retries}회 모두 실패, 로컬 파일에 저장합니다. (마지막 오류: {e})")
+# 시트 셀 한 칸(최대 5만 자)에 담는 게임 수 (압축 형식 게임당 4글자).
+# 대량 생성분은 여러 행으로 나눠 한 번에 추가
+HISTORY_ROW_GAMES = 10_000
+
+# 이력 탭에서 한 회차의 게임을 공 모양으로 그리는 최대 개수. 넘으면 표 한 개로 보여 준다
+HISTORY_RENDER_GAMES = 30
+
+
+@st.cache_resource
+def get_history_writer() -> HistoryWriter:
+    """프로세스 전체가 함께 쓰는 생성 이력 저장 큐. 지난 실행에서 남은 저널 요청부터 다시 보낸다."""
+    return HistoryWriter(get_history_cache()).start()
+
 
-    with open("lotto_history.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps({"epsd": epsd, "games": games}) + "\n")
-    return False
+def save_history(epsd: int, games) -> list:
+    """게임 목록(번호 리스트 또는 조합 순위 배열)을 압축 형식으로 저장 큐에 넣고 요청 id 목록을 반환.
+
+    시트 저장은 백그라운드에서 여러 세션의 요청과 함께 묶어 보내므로 기다리지 않는다.
+    """
+    ranks  = games if isinstance(games, np.ndarray) else rank_tickets(games)
+    chunks = [encode_tickets(ranks[i:i + HISTORY_ROW_GAMES]) for i in range(0, len(ranks), HISTORY_ROW_GAMES)]
+    return get_history_writer().submit(epsd, chunks)
+
+
+def show_save_status(tickets: list, done_text: str, local_text: str):
+    """저장 요청의 현재 상태 표시. 대기 중이면 이 부분만 2초마다 다시 그려 완료를 반영하고,
+    저장이 끝나면 앱 전체를 한 번 다시 그려 주기적 갱신을 멈춘다."""
+    writer  = get_history_writer()
+    polling = writer.status(tickets) == "pending"
+
+    def render():
+        state = writer.status(tickets)
+        if polling and state != "pending":
+            st.rerun()
+        if state == "pending":
+            st.info("번호 생성 완료! 구글 시트 저장 대기 중입니다... ⏳")
+        elif state == "local":
+            if writer.last_error is not None:
+                st.caption(f"마지막 오류: {writer.last_error}")
+            st.warning(local_text)
+        elif state == "saved":
+            st.success(done_text)
+        else:
+            # 오래되어 상태 기록에서 밀려났거나 이 프로세스가 모르는 요청
+            st.info("번호 생성 완료. 저장 상태를 확인할 수 없으니 생성 이력 탭에서 확인해 주세요.")
+
+    st.fragment(render, run_every=2 if polling else None)()
 
 
 # ==========================================
 # [2] AI 분석 엔진
 # ==========================================
-PRIMES = {2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43}
-
-# 실제 로또 OMR 구조: 1~45를 5열 9행으로 배치
-# 행: (n-1) // 5  →  0~8행
-# 열: (n-1) %  5  →  0~4열
-OMR_ROWS = 9
-OMR_COLS = 5
-
-
-class LottoAI:
-
-    def analyze_recent_trend(self, data: list, scope: int = 15) -> dict:
-        """최근 scope 회차 번호의 출현 빈도를 가중치로 반환."""
-        recent = data[:scope * 6]
-        counts = Counter(recent)
-        weights = {i: 1.0 for i in range(1, 46)}
-        for num, freq in counts.items():
-            weights[num] += freq * 0.5
-        return weights
-
-    def get_cold_numbers(self, data: list, scope: int = 15) -> set:
-        """최근 scope 회차 동안 한 번도 나오지 않은 미출수 반환."""
-        appeared = set(data[:scope * 6])
-        return set(range(1, 46)) - appeared
-
-    def has_cold_number(self, numbers: list, cold_set: set) -> bool:
-        """미출수가 1개 이상 포함되어 있는지 확인. cold_set이 비어있으면 통과."""
-        if not cold_set:
-            return True
-        return any(n in cold_set for n in numbers)
-
-    def passes_omr_filter(self, numbers: list) -> bool:
-        """실제 OMR 구조(5열 9행) 기준, 같은 행/열에 4개 이상 몰리는 패턴 차단."""
-        rows = [(n - 1) // OMR_COLS for n in numbers]
-        cols = [(n - 1) %  OMR_COLS for n in numbers]
-        if any(c >= 4 for c in Counter(rows).values()):
-            return False
-        if any(c >= 4 for c in Counter(cols).values()):
-            return False
-        return True
-
-    def has_end_digit_pair(self, numbers: list) -> bool:
-        """끝자리가 같은 번호가 1쌍 이상."""
-        end_digits = [n % 10 for n in numbers]
-        return any(c >= 2 for c in Counter(end_digits).values())
-
-    def has_dead_zone(self, numbers: list) -> bool:
-        """5구간 중 2개 이상이 비어있는지 (분산 패턴)."""
-        zones = [0] * 9
-        for n in numbers:
-            zones[(n - 1) // 5] = 1
-        return zones.count(0) >= 2
-
-    def passes_stat_filter(self, numbers: list) -> bool:
-        """합계, 홀짝, 고저 분포 통계 기준."""
-        total = sum(numbers)
-        if not (100 <= total <= 175):
-            return False
-        odd_count = sum(1 for n in numbers if n % 2 != 0)
-        if odd_count in (0, 6):
-            return False
-        low_count = sum(1 for n in numbers if n <= 22)
-        if low_count in (0, 6):
-            return False
-        return True
-
-    def has_consecutive(self, numbers: list) -> bool:
-        """연속 번호가 1쌍 이상."""
-        s = sorted(numbers)
-        return any(s[i + 1] == s[i] + 1 for i in range(len(s) - 1))
-
-    def passes_prime_filter(self, numbers: list) -> bool:
-        """소수 개수가 1~4개 (0개 또는 5개 이상은 희박)."""
-        prime_count = sum(1 for n in numbers if n in PRIMES)
-        return 1 <= prime_count <= 4
-
-    def passes_ac_filter(self, numbers: list) -> bool:
-        """AC값(번호 간 차이의 종류 수)이 7 이상."""
-        s = sorted(numbers)
-        diffs = set()
-        for i in range(len(s)):
-            for j in range(i + 1, len(s)):
-                diffs.add(s[j] - s[i])
-        return len(diffs) >= 7
-
-    def passes_section_balance(self, numbers: list) -> bool:
-        """전반부(1~22)와 후반부(23~45) 합의 차이가 50 미만."""
-        low_sum  = sum(n for n in numbers if n <= 22)
-        high_sum = sum(n for n in numbers if n > 22)
-        return abs(low_sum - high_sum) < 50
-
-    def passes_multiple_filter(self, numbers: list) -> bool:
-        """3의 배수 4개 이상, 또는 5의 배수 3개 이상 편중 차단."""
-        if sum(1 for n in numbers if n % 3 == 0) >= 4:
-            return False
-        if sum(1 for n in numbers if n % 5 == 0) >= 3:
-            return False
-        return True
-
-    def get_specs(self, numbers: list) -> str:
-        """번호 조합의 주요 스펙 요약 문자열 반환."""
-        total     = sum(numbers)
-        odd       = sum(1 for n in numbers if n % 2 != 0)
-        low       = sum(1 for n in numbers if n <= 22)
-        s         = sorted(numbers)
-        diffs     = set()
-        for i in range(len(s)):
-            for j in range(i + 1, len(s)):
-                diffs.add(s[j] - s[i])
-        ac = len(diffs) - 5
-        return f"합:{total} | 홀짝 {odd}:{6-odd} | 고저 {low}:{6-low} | AC:{ac}"
+@st.cache_resource(show_spinner="전체 조합 테이블을 준비 중입니다... (최초 1회)")
+def get_combination_table() -> CombinationTable:
+    return CombinationTable()
+
+
+def show_notices(generator: GameGenerator):
+    for level, message in generator.notices:
+        getattr(st, level)(message)
+
+    # 후보를 1개씩 검사하는 완화 방식을 거쳤으면 어떤 조건에서 얼마나 떨어졌는지 보여줌
+    diagnostics = generator.diagnostics
+    if diagnostics.get("drawn"):
+        rejected = sorted(diagnostics["rejected"].items(), key=lambda item: -item[1])
+        st.caption(
+            f"🔍 조건 완화 생성: 후보 {diagnostics['drawn']:,}개 중 {diagnostics['yielded']:,}개 채택"
+            + (" | 탈락: " + ", ".join(f"{FILTER_LABELS[key]} {count:,}" for key, count in rejected) if rejected else "")
+        )
 
 
-def generate_ai_games(
-    full_data: list,
+def iter_ai_games(
+    full_data: FrequencyIndex | list,
     weight_percent: int,
     options: dict,
     fixed_nums: list,
     excluded_nums: list,
-) -> list:
-    ai = LottoAI()
-
-    if options["use_trend"]:
-        trend_weights = ai.analyze_recent_trend(full_data, scope=15)
-        extra = weight_percent / 100.0
-        base_weights = [
-            trend_weights.get(i, 1.0) + extra if trend_weights.get(i, 1.0) > 1.0
-            else 1.0
-            for i in range(1, 46)
-        ]
+    count: int = 5,
+    engine: str = "table",
+    parallel: bool = False,
+    gaps: GapIndex | None = None,
+    cooccurrence: CooccurrenceIndex | None = None,
+):
+    """조건에 맞는 게임 count개를 여러 묶음으로 나눠 차례로 내보내는 제너레이터.
+
+    engine: "table"(전체 조합 테이블에서 직접 추출) 또는 "batch"(배열 단위 후보 생성 후 일괄 필터).
+    parallel이면 대량 요청을 프로세스 풀로 나눠 생성하고 중복 게임 없이 합친다.
+    gaps는 미출수/장기 미출 가중치에 쓸 출현 간격 색인, cooccurrence는 동반 출현 가중치에 쓸 색인.
+    """
+    generator = GameGenerator(
+        full_data, weight_percent, options, fixed_nums, excluded_nums,
+        table=get_combination_table(), engine=engine, gaps=gaps, cooccurrence=cooccurrence,
+    )
+    if parallel:
+        yield from iter_games_parallel(generator, full_data, weight_percent, count)
     else:
-        base_weights = [1.0] * 45
-
-    # 제외 번호 가중치 0 처리
-    final_weights = [
-        0.0 if (i in excluded_nums) else base_weights[i - 1]
-        for i in range(1, 46)
-    ]
+        yield from generator.iter_games(count)
+    show_notices(generator)
 
-    pool         = [i for i in range(1, 46) if i not in excluded_nums and i not in fixed_nums]
-    pool_weights = [final_weights[i - 1] for i in pool]
-    needed       = 6 - len(fixed_nums)
-    cold_numbers = ai.get_cold_numbers(full_data, scope=15)
-
-    final_games = []
-    relaxed_any = False
-
-    if needed < 0:
-        st.warning("고정 번호가 6개를 초과합니다. 고정 번호를 줄여주세요.")
-        return [sorted(fixed_nums[:6])] * 5
-
-    while len(final_games) < 5:
-        active_options = options.copy()
-        attempts = 0
-
-        while True:
-            attempts += 1
-
-            # 단계별 조건 완화 (덜 중요한 순서대로)
-            if attempts ==  2_000: active_options["use_omr"]             = False; relaxed_any = True
-            if attempts ==  3_000: active_options["use_dead_zone"]       = False; relaxed_any = True
-            if attempts ==  4_000: active_options["use_section_balance"] = False; relaxed_any = True
-            if attempts ==  5_000: active_options["use_multiple"]        = False; relaxed_any = True
-            if attempts ==  6_000: active_options["use_consecutive"]     = False; relaxed_any = True
-            if attempts ==  7_000: active_options["use_cold"]            = False; relaxed_any = True
-            if attempts ==  8_000: active_options["use_prime"]           = False; relaxed_any = True
-            if attempts ==  9_000: active_options["use_ac"]              = False; relaxed_any = True
-            if attempts == 10_000: active_options["use_stats"]           = False; relaxed_any = True
-            if attempts == 11_000: active_options["use_end_digit"]       = False; relaxed_any = True
-
-            if attempts > 12_000:
-                picks = random.sample(pool, min(needed, len(pool)))
-                final_games.append(sorted(fixed_nums + picks))
-                relaxed_any = True
-                break
-
-            if needed == 0:
-                candidate = sorted(fixed_nums)
-            else:
-                picks = random.choices(pool, weights=pool_weights, k=needed)
-                if len(set(picks)) < needed:
-                    continue
-                candidate = sorted(fixed_nums + picks)
-
-            if active_options.get("use_omr")             and not ai.passes_omr_filter(candidate):       continue
-            if active_options.get("use_cold")            and not ai.has_cold_number(candidate, cold_numbers): continue
-            if active_options.get("use_end_digit")       and not ai.has_end_digit_pair(candidate):      continue
-            if active_options.get("use_dead_zone")       and not ai.has_dead_zone(candidate):            continue
-            if active_options.get("use_stats")           and not ai.passes_stat_filter(candidate):       continue
-            if active_options.get("use_prime")           and not ai.passes_prime_filter(candidate):      continue
-            if active_options.get("use_ac")              and not ai.passes_ac_filter(candidate):         continue
-            if active_options.get("use_section_balance") and not ai.passes_section_balance(candidate):   continue
-            if active_options.get("use_multiple")        and not ai.passes_multiple_filter(candidate):   continue
-            if active_options.get("use_consecutive"):
-                if len(final_games) < 3 and not ai.has_consecutive(candidate):
-                    if random.random() < 0.7:
-                        continue
 
-            final_games.append(candidate)
-            break
+def generate_ai_games(
+    full_data: FrequencyIndex | list,
+    weight_percent: int,
+    options: dict,
+    fixed_nums: list,
+    excluded_nums: list,
+    count: int = 5,
+    engine: str = "table",
+    gaps: GapIndex | None = None,
+    cooccurrence: CooccurrenceIndex | None = None,
+) -> list:
+    return [
+        game
+        for chunk in iter_ai_games(full_data, weight_percent, options, fixed_nums, excluded_nums,
+                                   count=count, engine=engine, gaps=gaps, cooccurrence=cooccurrence)
+        for game in chunk
+    ]
 
-    if relaxed_any:
-        st.info("💡 일부 필터 조합이 까다로워 AI가 조건을 단계적으로 완화하여 번호를 생성했습니다.")
 
-    return final_games
+@st.cache_data(show_spinner="무작위 게임으로 필터 효과를 계산 중입니다...", max_entries=32)
+def estimate_filter_effect(active_filters: tuple, cold_numbers: tuple) -> dict:
+    """켜진 필터 조합과 미출수 집합별 몬테카를로 추정 결과 (같은 조합은 다시 계산하지 않음)."""
+    return estimate_filters(dict.fromkeys(active_filters, True), set(cold_numbers))
 
 
 # ==========================================
 # [3] 데이터 가져오기
 # ==========================================
-@st.cache_data(ttl=3600, show_spinner=False)
-def _fetch_lotto_data_cached():
-    url = "https://www.dhlottery.co.kr/lt645/selectPstLt645Info.do?srchLtEpsd=all"
-    res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-    res.raise_for_status()
-    data = res.json().get("data", {}).get("list", [])
-    if not data:
-        raise ValueError("API 응답에 데이터가 없습니다.")
-    return data
-
-
-def fetch_lotto_data(count: int):
+@st.cache_resource(show_spinner="당첨 결과를 불러오는 중입니다...")
+def get_draw_refresher() -> DrawRefresher:
+    """프로세스 전체가 함께 쓰는 갱신 스레드. 저장된 회차로 바로 시작한다.
+
+    처음 실행이라 저장된 회차가 없을 때만 한 번 기다려 받고, 이후 갱신은 백그라운드에서 한다.
+    그래도 받지 못하면 예외를 내서 캐시하지 않으므로 다음 실행 때 다시 시도한다.
+    """
+    refresher = DrawRefresher(DrawStore())
+    if not len(refresher.model):
+        refresher.refresh_now()
+        if not len(refresher.model):
+            raise refresher.last_error or ValueError("당첨 결과가 없습니다.")
+    return refresher.start()
+
+
+def get_draw_model():
+    """현재 전체 회차 모델 (갱신 스레드가 바꿔 끼운 최신 모델). 당첨 결과가 전혀 없으면 None."""
     try:
-        all_list = _fetch_lotto_data_cached()
-    except Exception as e:
-        return None, str(e)
+        model = get_draw_refresher().model
+    except Exception:
+        return None
+    return model if len(model) else None
 
-    all_list = sorted(all_list, key=lambda x: int(x.get("ltEpsd", 0)), reverse=True)
 
-    full_data_flat = []
-    for item in all_list:
-        nums = [int(item.get(f"tm{i}WnNo", 0)) for i in range(1, 7)]
-        full_data_flat.extend(nums)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_draw_index(data_version: tuple, _model: DrawModel) -> DrawIndex:
+    return DrawIndex(_model.episodes, _model.numbers, _model.bonus)
 
-    history_info = []
-    for item in all_list[:count]:
-        epsd  = int(item.get("ltEpsd", 0))
-        nums  = [int(item.get(f"tm{i}WnNo", 0)) for i in range(1, 7)]
-        bonus = int(item.get("bnusNo", 0))
-        history_info.append((epsd, nums, bonus))
 
-    return full_data_flat, history_info
+def get_draw_index(model: DrawModel) -> DrawIndex:
+    """전체 회차 당첨 결과 색인."""
+    return _build_draw_index(model.version, model)
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def _fetch_prize_cached(epsd: int) -> dict:
-    url = f"https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={epsd}"
-    res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
-    res.raise_for_status()
-    data = res.json()
-    if data.get("returnValue") == "success" and data.get("firstWinamnt", 0) > 0:
-        return data
-    raise ValueError("당첨금 정보가 아직 업데이트되지 않았습니다.")
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_frequency_index(data_version: tuple, _model: DrawModel) -> FrequencyIndex:
+    return FrequencyIndex(_model.numbers)
 
 
-def fetch_prize_info(epsd: int) -> dict:
-    default_prizes = {1: None, 2: 50_000_000, 3: 1_500_000, 4: 50_000, 5: 5_000}
-    try:
-        data = _fetch_prize_cached(epsd)
-        default_prizes[1] = data.get("firstWinamnt")
-    except Exception:
-        pass
-    return default_prizes
+def get_frequency_index(model: DrawModel) -> FrequencyIndex:
+    """회차별 번호 누적 출현 색인. 분석 회수/흐름 가중치/미출수/차트가 모두 여기서 구간 빈도를 읽는다."""
+    return _build_frequency_index(model.version, model)
+
+
+@st.cache_resource(show_spinner=False)
+def _draw_accumulators() -> tuple:
+    return GapIndex(), CooccurrenceIndex(), threading.Lock()
+
+
+def _synced(index, model: DrawModel):
+    """프로세스 전체가 함께 쓰는 회차 누적 색인. 새 회차가 나오면 그 회차만 이어 붙인다."""
+    *_, lock = _draw_accumulators()
+    if model.latest > index.latest:
+        with lock:
+            index.extend(model.episodes, model.numbers)
+    return index
+
+
+def get_gap_index(model: DrawModel) -> GapIndex:
+    """번호별 출현 간격 색인."""
+    return _synced(_draw_accumulators()[0], model)
+
+
+def get_cooccurrence_index(model: DrawModel) -> CooccurrenceIndex:
+    """두 번호/세 번호 동반 출현 색인."""
+    return _synced(_draw_accumulators()[1], model)
+
+
+@st.cache_resource(show_spinner=False)
+def get_stats_aggregate() -> StatsAggregate:
+    return StatsAggregate()
+
+
+@st.cache_resource(show_spinner=False)
+def get_prize_store() -> PrizeStore:
+    return PrizeStore()
 
 
 # ==========================================
@@ -442,6 +380,16 @@ def stat_box(value: str, title: str, color: str = "#333") -> str:
         f'</div>'
     )
 
+def format_prize(amount) -> str:
+    if not amount:
+        return "확인불가"
+    if amount >= 100_000_000:
+        return f"약 {amount // 100_000_000}억"
+    if amount >= 10_000:
+        return f"{amount // 10_000:,}만 원"
+    return f"{amount:,} 원"
+
+
 def get_prize_label(match: int, has_bonus: bool) -> tuple[str, bool]:
     """(등수 레이블, 하이라이트 여부) 반환."""
     if   match == 6:               return "🎉 1등 당첨!", True
@@ -492,7 +440,9 @@ footer { visibility: hidden !important; }
 for key, default in {
     "is_generating": False,
     "recent_generated_games": [],
-    "last_save_to_sheet": None,
+    "last_save_tickets": [],
+    "bulk_generated_games": [],
+    "bulk_save_tickets": [],
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
@@ -510,6 +460,8 @@ with st.sidebar:
     st.markdown("---")
     st.subheader("거르기 조건")
     sb_use_trend   = st.checkbox("🔥 흐름 가중치",       value=True, key="sb_trend")
+    sb_use_overdue = st.checkbox("⏳ 장기 미출 가중치",  value=False, key="sb_overdue")
+    sb_use_pair    = st.checkbox("🤝 동반 출현 가중치",  value=False, key="sb_pair")
     sb_use_cold    = st.checkbox("❄️ 미출수 부활",       value=True, key="sb_cold")
     sb_use_omr     = st.checkbox("📝 OMR 편중 차단",     value=True, key="sb_omr")
     sb_use_end     = st.checkbox("⚡ 끝자리 일치",       value=True, key="sb_end")
@@ -534,22 +486,26 @@ with st.sidebar:
 # ==========================================
 # [8] 데이터 로드
 # ==========================================
-full_data, history_info = fetch_lotto_data(sb_count_val)
-ai_engine = LottoAI()
+draw_model = get_draw_model()
+ai_engine  = LottoAI()
+
+if draw_model is not None and len(draw_model):
+    freq_index   = get_frequency_index(draw_model)
+    gap_index    = get_gap_index(draw_model)
+    pair_index   = get_cooccurrence_index(draw_model)
+    history_info = draw_model.window(sb_count_val).history_info()
 
-if full_data and history_info:
-    recent_nums = [n for _, nums, _ in history_info for n in nums]
-    top5 = Counter(recent_nums).most_common(5)
+    top5 = freq_index.most_common(5, scope=sb_count_val)
     hot_numbers_slot.markdown("".join(
         f"<div style='margin-bottom:5px;'>{get_ball_html(num)}"
         f" <span style='font-size:14px;font-weight:bold;color:#555;'>({freq}회 출현)</span></div>"
         for num, freq in top5
     ), unsafe_allow_html=True)
 
-    latest_epsd     = history_info[0][0]
+    latest_epsd     = draw_model.latest
     target_epsd     = latest_epsd + 1
     history_records = load_history()
-    epsd_result_map = {e: (set(n), b) for e, n, b in history_info}
+    draw_index      = get_draw_index(draw_model)
 
     st.title("인공지능 로또 분석기")
     tab_home, tab_stats, tab_history, tab_help = st.tabs([
@@ -572,6 +528,8 @@ if full_data and history_info:
                                                 value=sb_weight_val, step=10, key="mb_weight")
             with col_b:
                 mb_use_trend   = st.checkbox("🔥 흐름 가중치",     value=sb_use_trend,   key="mb_trend")
+                mb_use_overdue = st.checkbox("⏳ 장기 미출 가중치", value=sb_use_overdue, key="mb_overdue")
+                mb_use_pair    = st.checkbox("🤝 동반 출현 가중치", value=sb_use_pair,    key="mb_pair")
                 mb_use_cold    = st.checkbox("❄️ 미출수 부활",     value=sb_use_cold,    key="mb_cold")
                 mb_use_omr     = st.checkbox("📝 OMR 편중 차단",   value=sb_use_omr,     key="mb_omr")
                 mb_use_end     = st.checkbox("⚡ 끝자리 일치",     value=sb_use_end,     key="mb_end")
@@ -589,15 +547,12 @@ if full_data and history_info:
 
             # 모바일 핫넘버 (mb_count_val 기준으로 별도 로드)
             st.markdown(f"**🔥 최근 핫넘버 TOP 5** (최근 {mb_count_val}회 기준)")
-            mb_full_data, mb_history = fetch_lotto_data(mb_count_val)
-            if mb_history:
-                mb_nums = [n for _, nums, _ in mb_history for n in nums]
-                mb_top5 = Counter(mb_nums).most_common(5)
-                st.markdown("".join(
-                    f"<div style='display:inline-block;margin-right:8px;'>{get_ball_html(num)}"
-                    f"<span style='font-size:12px;color:#555;'> {freq}회</span></div>"
-                    for num, freq in mb_top5
-                ), unsafe_allow_html=True)
+            mb_top5 = freq_index.most_common(5, scope=mb_count_val)
+            st.markdown("".join(
+                f"<div style='display:inline-block;margin-right:8px;'>{get_ball_html(num)}"
+                f"<span style='font-size:12px;color:#555;'> {freq}회</span></div>"
+                for num, freq in mb_top5
+            ), unsafe_allow_html=True)
 
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -607,6 +562,8 @@ if full_data and history_info:
         excluded_nums = list(set(mb_excluded))
         options = {
             "use_trend":           mb_use_trend,
+            "use_overdue":         mb_use_overdue,
+            "use_pair":            mb_use_pair,
             "use_cold":            mb_use_cold,
             "use_omr":             mb_use_omr,
             "use_end_digit":       mb_use_end,
@@ -625,6 +582,8 @@ if full_data and history_info:
             st.error(f"고정 번호와 제외 번호가 겹칩니다: {sorted(conflict)} — 수정 후 다시 시도해주세요.")
         elif len(fixed_nums) > 5:
             st.error("고정 번호는 최대 5개까지만 설정할 수 있습니다.")
+        elif len(fixed_nums) + len(excluded_nums) > 39:
+            st.error("고정 번호와 제외 번호를 합쳐 최대 39개까지만 설정할 수 있습니다. (6개를 뽑을 번호가 부족합니다)")
         else:
             # 고정/제외 미리보기
             if fixed_nums or excluded_nums:
@@ -659,25 +618,65 @@ if full_data and history_info:
 
             if st.session_state.is_generating:
                 with st.spinner("최적의 번호를 계산 중입니다..."):
-                    games = generate_ai_games(full_data, weight_val, options, fixed_nums, excluded_nums)
-                with st.spinner("구글 시트에 저장 중... (최대 3회 재시도)"):
-                    saved_to_sheet = save_history(target_epsd, games)
-
+                    games = rank_tickets(generate_ai_games(
+                        freq_index, weight_val, options, fixed_nums, excluded_nums,
+                        gaps=gap_index, cooccurrence=pair_index,
+                    ))
                 st.session_state.recent_generated_games = games
-                st.session_state.last_save_to_sheet     = saved_to_sheet
+                st.session_state.last_save_tickets      = save_history(target_epsd, games)
                 st.session_state.is_generating          = False
                 st.rerun()
 
-            if st.session_state.recent_generated_games and not st.session_state.is_generating:
+            if len(st.session_state.recent_generated_games) and not st.session_state.is_generating:
                 st.markdown(f"### ✨ 새로 뽑힌 추천 번호 ({target_epsd}회차용)")
-                for i, game in enumerate(st.session_state.recent_generated_games):
+                for i, game in enumerate(unrank_tickets(st.session_state.recent_generated_games).tolist()):
                     draw_row(f"세트 {i + 1}", game, specs=ai_engine.get_specs(game))
-                if st.session_state.get("last_save_to_sheet"):
-                    st.success("생성 및 구글 시트 저장 완료! 최신 데이터가 통계 탭에 반영되었습니다. 🍀")
-                else:
-                    st.warning("번호 생성 완료. 구글 시트 저장에 실패하여 로컬 파일에 저장했습니다. 📁")
+                show_save_status(
+                    st.session_state.last_save_tickets,
+                    "생성 및 구글 시트 저장 완료! 최신 데이터가 통계 탭에 반영되었습니다. 🍀",
+                    "번호 생성 완료. 구글 시트 저장에 실패하여 로컬 파일에 저장했습니다. 📁",
+                )
                 st.markdown("<br>", unsafe_allow_html=True)
 
+            # 대량 생성 (공동구매용): 같은 조건으로 수백~수천 게임을 만들고 한 번에 저장
+            with st.expander("📦 대량 생성 (공동구매용)", expanded=False):
+                bulk_count = st.number_input(
+                    "생성할 게임 수", min_value=5, max_value=5_000, value=500, step=5, key="bulk_count"
+                )
+                if st.button(f"📦 {target_epsd}회차 {bulk_count:,}게임 대량 생성", use_container_width=True):
+                    progress   = st.progress(0.0, text="대량 생성 준비 중...")
+                    bulk_games = []
+                    for chunk in iter_ai_games(freq_index, weight_val, options, fixed_nums, excluded_nums,
+                                               count=bulk_count, parallel=True,
+                                               gaps=gap_index, cooccurrence=pair_index):
+                        bulk_games.extend(chunk)
+                        progress.progress(
+                            len(bulk_games) / bulk_count,
+                            text=f"{len(bulk_games):,} / {bulk_count:,} 게임 생성",
+                        )
+                    bulk_ranks = rank_tickets(bulk_games)
+                    st.session_state.bulk_generated_games = bulk_ranks
+                    st.session_state.bulk_save_tickets    = save_history(target_epsd, bulk_ranks)
+
+                bulk_ranks = st.session_state.get("bulk_generated_games")
+                if len(bulk_ranks):
+                    bulk_games = unrank_tickets(bulk_ranks)
+                    show_save_status(
+                        st.session_state.bulk_save_tickets,
+                        f"{len(bulk_games):,}게임 생성 및 구글 시트 저장 완료! 🍀",
+                        f"{len(bulk_games):,}게임 생성 완료. 구글 시트 저장에 실패하여 로컬 파일에 저장했습니다. 📁",
+                    )
+                    df_bulk = pd.DataFrame(bulk_games, columns=[f"번호{i}" for i in range(1, 7)])
+                    df_bulk.index = [f"#{i + 1}" for i in range(len(bulk_games))]
+                    st.download_button(
+                        "⬇️ CSV 다운로드",
+                        df_bulk.to_csv().encode("utf-8-sig"),
+                        file_name=f"lotto_{target_epsd}_{len(bulk_games)}games.csv",
+                        mime="text/csv",
+                        use_container_width=True,
+                    )
+                    st.dataframe(df_bulk, use_container_width=True, height=300)
+
         with st.expander(f"📋 최근 {sb_count_val}회 당첨 결과 확인하기", expanded=True):
             for epsd, nums, _ in reversed(history_info):
                 draw_row(f"{epsd}회", nums, is_header=True)
@@ -686,49 +685,27 @@ if full_data and history_info:
     # 탭 2: 수익률/통계 + 전체 이력 분석 + 빈도 차트
     # ==========================================
     with tab_stats:
-        latest_nums  = set(history_info[0][1])
-        latest_bonus = history_info[0][2]
+        # 회차별 누적 집계에서 읽기 (새 레코드와 새로 결과가 나온 회차만 반영)
+        stats_aggregate = get_stats_aggregate()
+        stats_aggregate.sync(history_records, draw_index)
+
+        this_week_usage_count = stats_aggregate.games(target_epsd)
+        total_games_last_week = stats_aggregate.games(latest_epsd)
+        prize_counts = stats_aggregate.prize_counts(latest_epsd) or {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, "fail": 0}
 
-        total_games_last_week = 0
-        this_week_usage_count = 0
-        prize_counts  = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, "fail": 0}
         winning_games = []
+        latest_mask, latest_bonus = draw_index.get(latest_epsd)
+        winner_games = unrank_tickets(stats_aggregate.winners(latest_epsd))
+        matched, has_bonus = match_tickets(ticket_masks(winner_games), latest_mask, latest_bonus)
+        for game, match, bonus in zip(winner_games.tolist(), matched.tolist(), has_bonus.tolist()):
+            label, _ = get_prize_label(match, bonus)
+            winning_games.append((label, game))
 
-        all_time_prize_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, "fail": 0}
-        all_time_total = 0
-
-        for record in history_records:
-            rec_epsd  = record.get("epsd")
-            rec_games = record.get("games", [])
-
-            if rec_epsd == target_epsd:
-                this_week_usage_count += len(rec_games)
-
-            if rec_epsd == latest_epsd:
-                for game in rec_games:
-                    total_games_last_week += 1
-                    match     = len(set(game) & latest_nums)
-                    has_bonus = latest_bonus in game
-                    label, _  = get_prize_label(match, has_bonus)
-                    if   match == 6:               prize_counts[1] += 1; winning_games.append((label, game))
-                    elif match == 5 and has_bonus: prize_counts[2] += 1; winning_games.append((label, game))
-                    elif match == 5:               prize_counts[3] += 1; winning_games.append((label, game))
-                    elif match == 4:               prize_counts[4] += 1
-                    elif match == 3:               prize_counts[5] += 1
-                    else:                          prize_counts["fail"] += 1
-
-            if rec_epsd in epsd_result_map:
-                w_nums, w_bonus = epsd_result_map[rec_epsd]
-                for game in rec_games:
-                    all_time_total += 1
-                    match     = len(set(game) & w_nums)
-                    has_bonus = w_bonus in game
-                    if   match == 6:               all_time_prize_counts[1] += 1
-                    elif match == 5 and has_bonus: all_time_prize_counts[2] += 1
-                    elif match == 5:               all_time_prize_counts[3] += 1
-                    elif match == 4:               all_time_prize_counts[4] += 1
-                    elif match == 3:               all_time_prize_counts[5] += 1
-                    else:                          all_time_prize_counts["fail"] += 1
+        all_time_total, all_time_prize_counts = stats_aggregate.all_time()
+
+        # 당첨금은 로컬 저장소에서 바로 읽고, 빠진 회차는 백그라운드에서 받아 둔다
+        prize_store = get_prize_store()
+        prize_store.prefetch(stats_aggregate.resolved_episodes() + [latest_epsd])
 
         # 이번 주 배너
         st.markdown(f"""
@@ -746,18 +723,16 @@ if full_data and history_info:
         if total_games_last_week == 0:
             st.info(f"아직 데이터베이스에 {latest_epsd}회차 생성 기록이 없습니다.")
         else:
-            prizes      = fetch_prize_info(latest_epsd)
+            prizes      = prize_store.get(latest_epsd)
+            estimated   = prize_store.estimated(latest_epsd)
             total_spent = total_games_last_week * 1_000
-            first_prize = prizes[1] if prizes[1] is not None else 0
-            total_won   = (
-                prize_counts[1] * first_prize +
-                prize_counts[2] * prizes[2] +
-                prize_counts[3] * prizes[3] +
-                prize_counts[4] * prizes[4] +
-                prize_counts[5] * prizes[5]
-            )
+            total_won   = sum(prize_counts[tier] * (prizes[tier] or 0) for tier in range(1, 6))
             roi = (total_won / total_spent * 100) if total_spent > 0 else 0
-            first_prize_label = f"약 {first_prize // 100_000_000}억" if first_prize else "확인불가"
+            won_label = "총 당첨 금액 (추정 포함)" if any(prize_counts[tier] for tier in estimated) else "총 당첨 금액"
+
+            def prize_title(tier: int) -> str:
+                amount = format_prize(prizes[tier])
+                return f"{tier}등 (추정 {amount})" if tier in estimated else f"{tier}등 ({amount})"
 
             st.markdown(f"""
 <div style="display:flex;flex-direction:row;justify-content:space-around;
@@ -767,7 +742,7 @@ if full_data and history_info:
     <div style="font-size:22px;font-weight:bold;color:#333;">{total_spent:,} 원</div>
   </div>
   <div style="text-align:center;">
-    <div style="font-size:14px;color:#555;">총 당첨 금액</div>
+    <div style="font-size:14px;color:#555;">{won_label}</div>
     <div style="font-size:22px;font-weight:bold;color:#E74C3C;">{total_won:,} 원</div>
   </div>
   <div style="text-align:center;">
@@ -779,13 +754,18 @@ if full_data and history_info:
 
             st.markdown(f"**총 {total_games_last_week:,}게임 중 당첨 내역**")
             c1, c2, c3 = st.columns(3)
-            with c1: st.markdown(stat_box(f"{prize_counts[1]:,} 회", f"1등 ({first_prize_label})", "#C0392B"), unsafe_allow_html=True)
-            with c2: st.markdown(stat_box(f"{prize_counts[2]:,} 회", "2등 (약 5천만)",            "#8E44AD"), unsafe_allow_html=True)
-            with c3: st.markdown(stat_box(f"{prize_counts[3]:,} 회", "3등 (약 150만)",             "#2980B9"), unsafe_allow_html=True)
+            with c1: st.markdown(stat_box(f"{prize_counts[1]:,} 회", prize_title(1), "#C0392B"), unsafe_allow_html=True)
+            with c2: st.markdown(stat_box(f"{prize_counts[2]:,} 회", prize_title(2), "#8E44AD"), unsafe_allow_html=True)
+            with c3: st.markdown(stat_box(f"{prize_counts[3]:,} 회", prize_title(3), "#2980B9"), unsafe_allow_html=True)
             c4, c5, c6 = st.columns(3)
-            with c4: st.markdown(stat_box(f"{prize_counts[4]:,} 회", "4등 (5만 원)",  "#F39C12"), unsafe_allow_html=True)
-            with c5: st.markdown(stat_box(f"{prize_counts[5]:,} 회", "5등 (5천 원)",  "#27AE60"), unsafe_allow_html=True)
+            with c4: st.markdown(stat_box(f"{prize_counts[4]:,} 회", prize_title(4), "#F39C12"), unsafe_allow_html=True)
+            with c5: st.markdown(stat_box(f"{prize_counts[5]:,} 회", prize_title(5), "#27AE60"), unsafe_allow_html=True)
             with c6: st.markdown(stat_box(f"{prize_counts['fail']:,} 회", "낙첨",     "#7F8C8D"), unsafe_allow_html=True)
+            if estimated:
+                st.caption(
+                    f"※ {'·'.join(f'{tier}등' for tier in estimated)} 당첨금은 아직 확인되지 않아 "
+                    "평균적인 금액으로 추정해 표시했습니다. 확인되면 실제 금액으로 바뀝니다."
+                )
 
             if winning_games:
                 st.markdown("---")
@@ -800,11 +780,19 @@ if full_data and history_info:
             st.info("분석할 이력 데이터가 없습니다. 번호를 생성하면 누적 통계가 쌓입니다.")
         else:
             hit_rate = (all_time_total - all_time_prize_counts["fail"]) / all_time_total * 100
+            all_time_won, all_time_estimated = 0, False
+            for epsd in stats_aggregate.resolved_episodes():
+                counts, amounts = stats_aggregate.prize_counts(epsd), prize_store.get(epsd)
+                all_time_won += sum(counts[tier] * (amounts[tier] or 0) for tier in range(1, 6))
+                all_time_estimated |= any(counts[tier] for tier in prize_store.estimated(epsd))
+            all_time_roi = all_time_won / (all_time_total * 1_000) * 100
+            roi_basis    = "일부 추정 당첨금 포함" if all_time_estimated else "실제 당첨금 기준"
             st.markdown(f"""
 <div style="background:#f8f9fa;border-radius:10px;padding:15px;margin-bottom:15px;border:1px solid #dee2e6;">
   <div style="font-size:14px;color:#555;margin-bottom:4px;">누적 분석 게임 수</div>
   <div style="font-size:28px;font-weight:bold;color:#2c3e50;">{all_time_total:,} 게임</div>
   <div style="font-size:14px;color:#27AE60;margin-top:4px;">전체 적중률 (5등 이상): <b>{hit_rate:.2f}%</b></div>
+  <div style="font-size:14px;color:#2980B9;margin-top:4px;">누적 수익률 ({roi_basis}): <b>{all_time_roi:,.1f}%</b></div>
 </div>
 """, unsafe_allow_html=True)
             ca, cb, cc = st.columns(3)
@@ -819,12 +807,39 @@ if full_data and history_info:
         # 번호별 출현 빈도 바 차트
         st.markdown("---")
         st.subheader(f"📊 최근 {sb_count_val}회 번호별 출현 빈도")
-        freq_dict = Counter(recent_nums)
         df_chart = pd.DataFrame({
-            "출현 횟수": [freq_dict.get(i, 0) for i in range(1, 46)]
+            "출현 횟수": freq_index.counts(sb_count_val)
         }, index=[f"{i}번" for i in range(1, 46)])
         st.bar_chart(df_chart, color="#2980B9")
 
+        # 번호별 출현 간격 차트
+        st.markdown("---")
+        st.subheader("⏳ 번호별 미출현 기간")
+        current_gaps = gap_index.current_gaps()
+        average_gaps = gap_index.average_gaps()
+        df_gap = pd.DataFrame({
+            "미출현 회차": current_gaps
+        }, index=[f"{i}번" for i in range(1, 46)])
+        st.bar_chart(df_gap, color="#8E44AD")
+        overdue_top = np.argsort(-gap_index.overdue_scores(), kind="stable")[:5]
+        st.caption("평균 간격 대비 가장 오래 안 나온 번호: " + ", ".join(
+            f"{i + 1}번({current_gaps[i]}회째 / 평균 {average_gaps[i]:.1f}회, 최장 {gap_index.longest_gaps()[i]}회)"
+            for i in overdue_top
+        ))
+
+        # 함께 자주 나온 번호
+        st.markdown("---")
+        st.subheader(f"🤝 함께 자주 나온 번호 (전체 {pair_index.draws:,}회)")
+        pc1, pc2 = st.columns(2)
+        with pc1:
+            st.markdown("**두 번호**")
+            for (a, b), cnt in pair_index.top_pairs(5):
+                st.markdown(f"{get_ball_html(a)}{get_ball_html(b)} <b>{cnt}회</b>", unsafe_allow_html=True)
+        with pc2:
+            st.markdown("**세 번호**")
+            for triple, cnt in pair_index.top_triples(5):
+                st.markdown("".join(get_ball_html(n) for n in triple) + f" <b>{cnt}회</b>", unsafe_allow_html=True)
+
     # ==========================================
     # 탭 3: 번호 생성 이력
     # ==========================================
@@ -840,17 +855,19 @@ if full_data and history_info:
                 e = record.get("epsd")
                 if e not in epsd_groups:
                     epsd_groups[e] = []
-                epsd_groups[e].extend(record.get("games", []))
+                epsd_groups[e].append(record["ranks"])
 
             for epsd in sorted(epsd_groups.keys(), reverse=True):
-                games_list = epsd_groups[epsd]
-                won_set, won_bonus = epsd_result_map.get(epsd, (None, None))
+                games_arr  = unrank_tickets(np.concatenate(epsd_groups[epsd]))
+                games_list = games_arr.tolist()
+                won_mask, won_bonus = draw_index.get(epsd) or (None, None)
 
                 # 3등 이상 당첨 여부 판별
-                has_upper_win = any(
-                    len(set(g) & won_set) >= 5
-                    for g in games_list
-                ) if won_set else False
+                if won_mask:
+                    matched, has_bonus = match_tickets(ticket_masks(games_arr), won_mask, won_bonus)
+                    has_upper_win = bool((matched >= 5).any())
+                else:
+                    has_upper_win = False
 
                 if show_only_wins and not has_upper_win:
                     continue
@@ -863,17 +880,25 @@ if full_data and history_info:
                     f"🗓️ {epsd}회차 — {len(games_list)}게임{suffix}",
                     expanded=(epsd == target_epsd or has_upper_win),
                 ):
-                    if won_set:
+                    if won_mask:
                         st.markdown("**해당 회차 당첨 번호**")
-                        draw_row("당첨", sorted(list(won_set)), is_header=True)
+                        draw_row("당첨", mask_numbers(won_mask), is_header=True)
                         st.markdown("---")
 
+                    if len(games_list) > HISTORY_RENDER_GAMES:
+                        df_games = pd.DataFrame(games_list, columns=[f"번호{i}" for i in range(1, 7)])
+                        df_games.index = [f"#{i + 1}" for i in range(len(games_list))]
+                        if won_mask:
+                            df_games["결과"] = [
+                                get_prize_label(int(m), bool(b))[0] for m, b in zip(matched, has_bonus)
+                            ]
+                        st.dataframe(df_games, use_container_width=True, height=300)
+                        continue
+
                     for i, game in enumerate(games_list):
                         specs_str = ai_engine.get_specs(game)
-                        if won_set:
-                            match       = len(set(game) & won_set)
-                            has_bonus   = won_bonus in game
-                            lbl, hilite = get_prize_label(match, has_bonus)
+                        if won_mask:
+                            lbl, hilite = get_prize_label(int(matched[i]), bool(has_bonus[i]))
                             draw_row(f"#{i+1} {lbl}", game, specs=specs_str, highlight=hilite)
                         else:
                             draw_row(f"#{i+1}", game, specs=specs_str)
@@ -893,6 +918,10 @@ if full_data and history_info:
         filters = [
             ("🔥 흐름 가중치 (Trend Weight)",          "info",
              "최근 15주 자주 나온 'Hot Number'가 당분간 계속 나오는 경향성을 반영하여 해당 번호의 뽑힐 확률을 높입니다."),
+            ("⏳ 장기 미출 가중치 (Overdue Weight)",    "warning",
+             "번호마다 평소 출현 간격(평균)을 계산해, 평균보다 오래 나오지 않은 번호일수록 뽑힐 확률을 더 높입니다. 흐름 가중치(%) 값을 함께 사용합니다."),
+            ("🤝 동반 출현 가중치 (Pair Affinity)",      "info",
+             "역대 회차에서 두 번호가 함께 나온 횟수를 모두 세어, 함께 자주 나온 번호 쌍을 많이 담은 조합일수록 뽑힐 확률을 최대 2배까지 높입니다."),
             ("❄️ 미출수 부활 (Cold Number)",            "success",
              "최근 15주간 단 한 번도 나오지 않은 '장기 미출수'를 강제로 1개 이상 포함시켜 회귀의 법칙을 적용합니다."),
             ("📝 OMR 편중 차단 (OMR Pattern)",          "error",
@@ -921,6 +950,35 @@ if full_data and history_info:
             st.markdown(f"#### {title}")
             getattr(st, style)(desc)
 
+        st.markdown("---")
+        st.subheader("🎲 필터 효과 시뮬레이션")
+        st.caption(
+            "완전 무작위 게임 200만 개에 현재 켜진 거르기 조건을 적용해, 조건별 통과율과 "
+            "통과한 게임이 무작위 추첨에서 받는 등수 빈도를 95% 신뢰구간과 함께 보여줍니다."
+        )
+        if st.button("시뮬레이션 실행", key="run_estimate"):
+            active_filters = tuple(key for key in HARD_FILTERS if options.get(key))
+            cold_numbers   = tuple(sorted(gap_index.cold_numbers(15))) if "use_cold" in active_filters else ()
+            est = estimate_filter_effect(active_filters, cold_numbers)
+
+            filter_rows = [
+                {"조건": FILTER_LABELS[key], "사용": "✅" if key in active_filters else "",
+                 "통과율": f"{rate:.2%}", "95% 구간": f"{lo:.2%} ~ {hi:.2%}"}
+                for key, (rate, lo, hi) in est["filters"].items()
+            ]
+            rate, lo, hi = est["joint"]
+            filter_rows.append({"조건": "켜진 조건 전체", "사용": "", "통과율": f"{rate:.2%}",
+                                "95% 구간": f"{lo:.2%} ~ {hi:.2%}"})
+            st.dataframe(pd.DataFrame(filter_rows), hide_index=True, use_container_width=True)
+
+            st.markdown(f"**통과한 게임 {est['accepted']:,}개의 등수 빈도** (무작위 1게임 확률과 비교)")
+            st.dataframe(pd.DataFrame([
+                {"등수": f"{tier}등", "시뮬레이션": f"{freq:.3e}", "95% 구간": f"{lo:.2e} ~ {hi:.2e}",
+                 "무작위 확률": f"{est['baseline'][tier]:.3e}"}
+                for tier, (freq, lo, hi) in est["tiers"].items()
+            ]), hide_index=True, use_container_width=True)
+            st.info("추첨은 매 회 독립이므로, 거르기 조건은 당첨 확률을 바꾸지 않고 번호 구성만 바꿉니다.")
+
         st.markdown("---")
         st.error(
             "### ⚠️ 꼭 읽어주세요 (면책 조항)\n"
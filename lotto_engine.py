@@ -0,0 +1,1375 @@
+import abc
+import base64
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+
+# ==========================================
+# [1] AI 분석 엔진
+# ==========================================
+PRIMES = {2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43}
+
+# 실제 로또 OMR 구조: 1~45를 5열 9행으로 배치
+# 행: (n-1) // 5  →  0~8행
+# 열: (n-1) %  5  →  0~4열
+OMR_ROWS = 9
+OMR_COLS = 5
+
+
+class LottoAI:
+
+    def analyze_recent_trend(self, data, scope: int = 15) -> dict:
+        """최근 scope 회차 번호의 출현 빈도를 가중치로 반환. data는 최신순 번호 목록 또는 FrequencyIndex."""
+        counts = as_frequency_index(data).counts(scope)
+        return {i: 1.0 + counts[i - 1] * 0.5 for i in range(1, 46)}
+
+    def get_cold_numbers(self, data, scope: int = 15) -> set:
+        """최근 scope 회차 동안 한 번도 나오지 않은 미출수 반환."""
+        return as_frequency_index(data).cold_numbers(scope)
+
+    def has_cold_number(self, numbers: list, cold_set: set) -> bool:
+        """미출수가 1개 이상 포함되어 있는지 확인. cold_set이 비어있으면 통과."""
+        if not cold_set:
+            return True
+        return any(n in cold_set for n in numbers)
+
+    def passes_omr_filter(self, numbers: list) -> bool:
+        """실제 OMR 구조(5열 9행) 기준, 같은 행/열에 4개 이상 몰리는 패턴 차단."""
+        rows = [(n - 1) // OMR_COLS for n in numbers]
+        cols = [(n - 1) %  OMR_COLS for n in numbers]
+        if any(c >= 4 for c in Counter(rows).values()):
+            return False
+        if any(c >= 4 for c in Counter(cols).values()):
+            return False
+        return True
+
+    def has_end_digit_pair(self, numbers: list) -> bool:
+        """끝자리가 같은 번호가 1쌍 이상."""
+        end_digits = [n % 10 for n in numbers]
+        return any(c >= 2 for c in Counter(end_digits).values())
+
+    def has_dead_zone(self, numbers: list) -> bool:
+        """5구간 중 2개 이상이 비어있는지 (분산 패턴)."""
+        zones = [0] * 9
+        for n in numbers:
+            zones[(n - 1) // 5] = 1
+        return zones.count(0) >= 2
+
+    def passes_stat_filter(self, numbers: list) -> bool:
+        """합계, 홀짝, 고저 분포 통계 기준."""
+        total = sum(numbers)
+        if not (100 <= total <= 175):
+            return False
+        odd_count = sum(1 for n in numbers if n % 2 != 0)
+        if odd_count in (0, 6):
+            return False
+        low_count = sum(1 for n in numbers if n <= 22)
+        if low_count in (0, 6):
+            return False
+        return True
+
+    def has_consecutive(self, numbers: list) -> bool:
+        """연속 번호가 1쌍 이상."""
+        s = sorted(numbers)
+        return any(s[i + 1] == s[i] + 1 for i in range(len(s) - 1))
+
+    def passes_prime_filter(self, numbers: list) -> bool:
+        """소수 개수가 1~4개 (0개 또는 5개 이상은 희박)."""
+        prime_count = sum(1 for n in numbers if n in PRIMES)
+        return 1 <= prime_count <= 4
+
+    def passes_ac_filter(self, numbers: list) -> bool:
+        """AC값(번호 간 차이의 종류 수)이 7 이상."""
+        s = sorted(numbers)
+        diffs = set()
+        for i in range(len(s)):
+            for j in range(i + 1, len(s)):
+                diffs.add(s[j] - s[i])
+        return len(diffs) >= 7
+
+    def passes_section_balance(self, numbers: list) -> bool:
+        """전반부(1~22)와 후반부(23~45) 합의 차이가 50 미만."""
+        low_sum  = sum(n for n in numbers if n <= 22)
+        high_sum = sum(n for n in numbers if n > 22)
+        return abs(low_sum - high_sum) < 50
+
+    def passes_multiple_filter(self, numbers: list) -> bool:
+        """3의 배수 4개 이상, 또는 5의 배수 3개 이상 편중 차단."""
+        if sum(1 for n in numbers if n % 3 == 0) >= 4:
+            return False
+        if sum(1 for n in numbers if n % 5 == 0) >= 3:
+            return False
+        return True
+
+    def get_specs(self, numbers: list) -> str:
+        """번호 조합의 주요 스펙 요약 문자열 반환."""
+        total     = sum(numbers)
+        odd       = sum(1 for n in numbers if n % 2 != 0)
+        low       = sum(1 for n in numbers if n <= 22)
+        s         = sorted(numbers)
+        diffs     = set()
+        for i in range(len(s)):
+            for j in range(i + 1, len(s)):
+                diffs.add(s[j] - s[i])
+        ac = len(diffs) - 5
+        return f"합:{total} | 홀짝 {odd}:{6-odd} | 고저 {low}:{6-low} | AC:{ac}"
+
+    def filter_checks(self, cold_set: set) -> dict:
+        """옵션 키별 후보 검사 함수 (통과하면 True)."""
+        return {
+            "use_omr":             self.passes_omr_filter,
+            "use_cold":            lambda numbers: self.has_cold_number(numbers, cold_set),
+            "use_end_digit":       self.has_end_digit_pair,
+            "use_dead_zone":       self.has_dead_zone,
+            "use_stats":           self.passes_stat_filter,
+            "use_prime":           self.passes_prime_filter,
+            "use_ac":              self.passes_ac_filter,
+            "use_section_balance": self.passes_section_balance,
+            "use_multiple":        self.passes_multiple_filter,
+        }
+
+    def candidate_stream(self, draw, stages: list, diagnostics: dict | None = None, max_draws: int | None = None):
+        """draw()로 후보를 하나씩 만들어 stages를 차례로 모두 통과한 것만 내보내는 제너레이터.
+
+        필요한 만큼만 꺼내 쓰고 멈추면 되며, 후보를 max_draws개 뽑으면 끝난다 (None이면 끝없이).
+        diagnostics를 주면 뽑은 수("drawn"), 내보낸 수("yielded"), 단계별 탈락 수("rejected")를 누적한다.
+        """
+        diag = diagnostics if diagnostics is not None else {}
+        diag.setdefault("drawn", 0)
+        diag.setdefault("yielded", 0)
+        rejected = diag.setdefault("rejected", {})
+
+        drawn = 0
+        while max_draws is None or drawn < max_draws:
+            candidate = draw()
+            drawn += 1
+            diag["drawn"] += 1
+            for name, check in stages:
+                if not check(candidate):
+                    rejected[name] = rejected.get(name, 0) + 1
+                    break
+            else:
+                diag["yielded"] += 1
+                yield candidate
+
+
+class AdaptiveFilterChain:
+    """LottoAI 필터를 후보 1개씩 검사하되, 실행 중 측정한 비용과 탈락률로 검사 순서를 조정.
+
+    (평균 호출 비용 / 탈락률)이 작은 필터, 즉 싸고 많이 걸러내는 필터를 먼저 검사하므로
+    탈락할 후보는 가능한 한 적은 작업으로 버려진다. 필터마다 candidate_stream의 단계 하나가
+    되므로 스트림의 진단 정보에 어떤 필터가 후보를 떨어뜨렸는지 그대로 남는다.
+    """
+
+    def __init__(self, ai: LottoAI, cold_set: set, reorder_every: int = 256):
+        self.checks  = ai.filter_checks(cold_set)
+        self.order   = list(self.checks)
+        self.calls   = dict.fromkeys(self.checks, 0)
+        self.rejects = dict.fromkeys(self.checks, 0)
+        self.seconds = dict.fromkeys(self.checks, 0.0)
+        self.reorder_every = reorder_every
+        self._checked = 0
+
+    def stages(self, active_options: dict) -> list:
+        """active_options에서 켜진 필터를 현재 순서대로 candidate_stream 단계 (이름, 검사 함수) 목록으로 반환.
+
+        마지막 정렬 뒤 검사가 reorder_every번 넘게 쌓였으면 측정값으로 순서를 먼저 다시 정한다.
+        """
+        if self._checked >= self.reorder_every:
+            self.order.sort(key=self.rank)
+            self._checked = 0
+        return [(key, self._measured(key)) for key in self.order if active_options.get(key)]
+
+    def _measured(self, key: str):
+        check = self.checks[key]
+
+        def measured(numbers: list) -> bool:
+            started = time.perf_counter()
+            passed  = check(numbers)
+            self.seconds[key] += time.perf_counter() - started
+            self.calls[key]   += 1
+            self._checked     += 1
+            if not passed:
+                self.rejects[key] += 1
+            return passed
+
+        return measured
+
+    def rank(self, key: str) -> float:
+        """평균 비용 / 탈락률 (측정 전에는 같은 값이 되도록 1회 통과·1회 탈락을 가정)."""
+        calls = self.calls[key]
+        avg_cost    = self.seconds[key] / calls if calls else 0.0
+        reject_rate = (self.rejects[key] + 1) / (calls + 2)
+        return avg_cost / reject_rate
+
+
+# ==========================================
+# [2] 벡터화 필터 (N x 6 정렬 배열 단위)
+# ==========================================
+# 각 함수는 LottoAI의 같은 이름 필터와 동일한 기준을 배열 연산으로 적용한다.
+# 입력은 행마다 오름차순 정렬된 (N, 6) 정수 배열, 출력은 길이 N의 bool 배열.
+_PRIME_LUT = np.zeros(46, dtype=bool)
+_PRIME_LUT[list(PRIMES)] = True
+
+_PAIR_I, _PAIR_J = np.triu_indices(6, k=1)
+
+
+def number_lut(numbers) -> np.ndarray:
+    """번호 집합을 번호로 바로 조회할 수 있는 길이 46 bool 배열로 변환."""
+    lut = np.zeros(46, dtype=bool)
+    lut[list(numbers)] = True
+    return lut
+
+
+def vec_omr_filter(c: np.ndarray) -> np.ndarray:
+    rows = (c - 1) // OMR_COLS
+    cols = np.sort((c - 1) % OMR_COLS, axis=1)
+    # 정렬된 6개 중 i번째와 i+3번째가 같으면 같은 값이 4개 이상
+    row_heavy = (rows[:, 3:] == rows[:, :3]).any(axis=1)
+    col_heavy = (cols[:, 3:] == cols[:, :3]).any(axis=1)
+    return ~(row_heavy | col_heavy)
+
+
+def vec_end_digit_pair(c: np.ndarray) -> np.ndarray:
+    ends = np.sort(c % 10, axis=1)
+    return (ends[:, 1:] == ends[:, :-1]).any(axis=1)
+
+
+def vec_dead_zone(c: np.ndarray) -> np.ndarray:
+    zones    = (c - 1) // 5
+    occupied = 1 + (zones[:, 1:] != zones[:, :-1]).sum(axis=1)
+    return (9 - occupied) >= 2
+
+
+def vec_stat_filter(c: np.ndarray) -> np.ndarray:
+    total = c.sum(axis=1)
+    odd   = (c % 2).sum(axis=1)
+    low   = (c <= 22).sum(axis=1)
+    return (
+        (total >= 100) & (total <= 175)
+        & (odd > 0) & (odd < 6)
+        & (low > 0) & (low < 6)
+    )
+
+
+def vec_consecutive(c: np.ndarray) -> np.ndarray:
+    return (np.diff(c, axis=1) == 1).any(axis=1)
+
+
+def vec_prime_filter(c: np.ndarray) -> np.ndarray:
+    prime_count = _PRIME_LUT[c].sum(axis=1)
+    return (prime_count >= 1) & (prime_count <= 4)
+
+
+def vec_ac_filter(c: np.ndarray) -> np.ndarray:
+    diffs    = np.sort(c[:, _PAIR_J] - c[:, _PAIR_I], axis=1)
+    distinct = 1 + (diffs[:, 1:] != diffs[:, :-1]).sum(axis=1)
+    return distinct >= 7
+
+
+def vec_section_balance(c: np.ndarray) -> np.ndarray:
+    low_sum  = np.where(c <= 22, c, 0).sum(axis=1)
+    high_sum = c.sum(axis=1) - low_sum
+    return np.abs(low_sum - high_sum) < 50
+
+
+def vec_multiple_filter(c: np.ndarray) -> np.ndarray:
+    return ((c % 3 == 0).sum(axis=1) < 4) & ((c % 5 == 0).sum(axis=1) < 3)
+
+
+# 데이터와 무관하게 조합만으로 결정되는 필터 → 비트 위치
+# (미출수 필터는 회차 데이터에 따라 달라지므로 조회 시점에 따로 적용)
+FILTER_BITS = {
+    "use_omr":             1 << 0,
+    "use_end_digit":       1 << 1,
+    "use_dead_zone":       1 << 2,
+    "use_stats":           1 << 3,
+    "use_consecutive":     1 << 4,
+    "use_prime":           1 << 5,
+    "use_ac":              1 << 6,
+    "use_section_balance": 1 << 7,
+    "use_multiple":        1 << 8,
+}
+
+VECTOR_FILTERS = {
+    "use_omr":             vec_omr_filter,
+    "use_end_digit":       vec_end_digit_pair,
+    "use_dead_zone":       vec_dead_zone,
+    "use_stats":           vec_stat_filter,
+    "use_consecutive":     vec_consecutive,
+    "use_prime":           vec_prime_filter,
+    "use_ac":              vec_ac_filter,
+    "use_section_balance": vec_section_balance,
+    "use_multiple":        vec_multiple_filter,
+}
+
+# 미출수 포함 여부는 조회 시점에 계산해 히스토그램 키의 이 비트에 싣는다
+COLD_BIT = 1 << len(FILTER_BITS)
+
+# 조건을 완화할 때 끄는 순서 (덜 중요한 필터부터)
+RELAXATION_ORDER = [
+    "use_omr", "use_dead_zone", "use_section_balance", "use_multiple", "use_consecutive",
+    "use_cold", "use_prime", "use_ac", "use_stats", "use_end_digit",
+]
+
+# 이어지는 번호 규칙: 한 세트(5게임) 중 앞 3게임은 연속 번호가 없는 후보를 70% 확률로 버림
+GAMES_PER_SET      = 5
+CONSECUTIVE_GAMES  = 3
+CONSECUTIVE_REJECT = 0.7
+
+
+def filter_bits(combos: np.ndarray) -> np.ndarray:
+    """정렬된 (N, 6) 조합 배열의 정적 필터 통과 여부를 조합별 비트마스크로 반환."""
+    c = combos.astype(np.int16)
+    bits = np.zeros(len(c), dtype=np.uint16)
+    for key, vec_filter in VECTOR_FILTERS.items():
+        bits[vec_filter(c)] |= FILTER_BITS[key]
+    return bits
+
+
+def required_bits(options: dict) -> int:
+    """options에서 켜진 필수(하드) 필터의 비트 합. 이어지는 번호는 확률 규칙이라 제외."""
+    return sum(
+        bit for key, bit in FILTER_BITS.items()
+        if key != "use_consecutive" and options.get(key)
+    )
+
+
+# ==========================================
+# [3] 전체 조합 테이블
+# ==========================================
+TOTAL_COMBINATIONS = comb(45, 6)  # 8,145,060
+
+
+class CombinationTable:
+    """1~45 중 6개 전체 조합과 조합별 필터 비트마스크를 한 번만 계산해 보관.
+
+    조합은 사전순(itertools.combinations 순서)으로 저장되며,
+    필터 조건에 맞는 조합 집합에서 가중치에 비례해 바로 뽑으므로 기각이 없다.
+    조건별 완화 계획(후보 행)과 가중치별 WeightedRows는 최근 max_cached개씩 기억해 두므로,
+    같은 조건으로 다시 생성할 때는 전체 조합을 다시 훑지 않는다. 여러 세션이 함께 써도 된다.
+    """
+
+    def __init__(self, chunk_size: int = 1_000_000, max_cached: int = 4):
+        # 행 번호가 곧 조합 순위이므로 순위를 덩어리째 복원해 채운다
+        self.combos = np.empty((TOTAL_COMBINATIONS, 6), dtype=np.uint8)
+        self.bits   = np.empty(TOTAL_COMBINATIONS, dtype=np.uint16)
+        for start in range(0, TOTAL_COMBINATIONS, chunk_size):
+            stop = min(start + chunk_size, TOTAL_COMBINATIONS)
+            self.combos[start:stop] = unrank_tickets(np.arange(start, stop))
+            self.bits[start:stop]   = filter_bits(self.combos[start:stop])
+
+        self.max_cached = max_cached
+        self._plans     = OrderedDict()
+        self._weighted  = OrderedDict()
+        self._lock      = threading.RLock()
+
+    def candidate_rows(
+        self,
+        options: dict,
+        fixed_nums: list,
+        excluded_nums: list,
+        cold_set: set,
+    ) -> np.ndarray:
+        """현재 options, 고정/제외 번호, 미출수 조건을 모두 만족하는 조합의 행 번호."""
+        required = required_bits(options)
+        rows = np.flatnonzero((self.bits & required) == required).astype(np.int32)
+
+        sub  = self.combos[rows]
+        keep = np.ones(len(rows), dtype=bool)
+        if fixed_nums:
+            keep &= number_lut(fixed_nums)[sub].sum(axis=1) == len(set(fixed_nums))
+        if excluded_nums:
+            keep &= ~number_lut(excluded_nums)[sub].any(axis=1)
+        if options.get("use_cold") and cold_set:
+            keep &= number_lut(cold_set)[sub].any(axis=1)
+        return rows[keep]
+
+    def filter_histogram(self, fixed_nums: list, excluded_nums: list, cold_set: set) -> np.ndarray:
+        """고정/제외 번호를 만족하는 조합 수를 (필터 비트 | 미출수 비트) 값별로 센 배열."""
+        keys = self.bits
+        if fixed_nums or excluded_nums:
+            keep = np.ones(TOTAL_COMBINATIONS, dtype=bool)
+            if fixed_nums:
+                keep &= number_lut(fixed_nums)[self.combos].sum(axis=1) == len(set(fixed_nums))
+            if excluded_nums:
+                keep &= ~number_lut(excluded_nums)[self.combos].any(axis=1)
+            rows = np.flatnonzero(keep)
+            keys = self.bits[rows]
+        else:
+            rows = slice(None)
+        if cold_set:
+            has_cold = number_lut(cold_set)[self.combos[rows]].any(axis=1)
+            keys = keys | np.where(has_cold, COLD_BIT, 0).astype(np.uint16)
+        return np.bincount(keys, minlength=COLD_BIT << 1)
+
+    def plan_relaxation(
+        self,
+        options: dict,
+        fixed_nums: list,
+        excluded_nums: list,
+        cold_set: set,
+    ) -> tuple[dict, list, np.ndarray]:
+        """조건을 만족하는 조합이 생기도록 꺼야 하는 최소한의 필터를 정확한 개수 계산으로 결정.
+
+        options 그대로 조합이 남으면 바로 돌려주고, 없을 때만 히스토그램을 만들어
+        RELAXATION_ORDER 순서로 하나씩 끄다가 조합이 생기면 멈춘다. 그 과정에서 끈 필터 중
+        다시 켜도 조합이 남는 것은 중요한 것부터 되살린다.
+        (완화된 options, 끈 필터 목록, 완화 후 후보 행)을 반환한다.
+        """
+        rows = self.candidate_rows(options, fixed_nums, excluded_nums, cold_set)
+        if len(rows) > 0:
+            return options.copy(), [], rows
+
+        hist = self.filter_histogram(fixed_nums, excluded_nums, cold_set)
+        keys = np.arange(len(hist))
+
+        def count(opts: dict) -> int:
+            required = required_bits(opts)
+            if opts.get("use_cold") and cold_set:
+                required |= COLD_BIT
+            return int(hist[(keys & required) == required].sum())
+
+        active    = options.copy()
+        remaining = 0
+        dropped   = []
+        for key in RELAXATION_ORDER:
+            if remaining > 0:
+                break
+            # 이어지는 번호는 확률 규칙이라 조합 수에 영향이 없음
+            if key == "use_consecutive" or not active.get(key):
+                continue
+            active[key] = False
+            dropped.append(key)
+            remaining = count(active)
+
+        for key in reversed(dropped[:-1]):
+            active[key] = True
+            if count(active) == 0:
+                active[key] = False
+        dropped = [key for key in dropped if not active[key]]
+        return active, dropped, self.candidate_rows(active, fixed_nums, excluded_nums, cold_set)
+
+    def plan(
+        self,
+        options: dict,
+        fixed_nums: list,
+        excluded_nums: list,
+        cold_set: set,
+    ) -> tuple[dict, list, np.ndarray]:
+        """plan_relaxation 결과를 (켜진 필터, 고정/제외 번호, 미출수) 조건별로 기억해 두고 돌려준다."""
+        key = _condition_key(options, fixed_nums, excluded_nums, cold_set)
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                dropped, rows = self._plans[key]
+            else:
+                _, dropped, rows = self.plan_relaxation(options, fixed_nums, excluded_nums, cold_set)
+                rows.setflags(write=False)
+                _remember(self._plans, key, (dropped, rows), self.max_cached)
+        return {**options, **dict.fromkeys(dropped, False)}, list(dropped), rows
+
+    def weighted_rows(
+        self,
+        options: dict,
+        fixed_nums: list,
+        excluded_nums: list,
+        cold_set: set,
+        number_weights: list,
+        affinity: "CooccurrenceIndex | None" = None,
+    ) -> "WeightedRows":
+        """plan의 후보 행에 번호 가중치(와 동반 출현 배수)를 입힌 WeightedRows.
+
+        조건, 가중치, 동반 출현 색인의 데이터 버전이 같으면 다시 계산하지 않는다.
+        """
+        key = (
+            _condition_key(options, fixed_nums, excluded_nums, cold_set),
+            tuple(float(w) for w in number_weights),
+            None if affinity is None else (id(affinity), affinity.latest, affinity.draws),
+        )
+        with self._lock:
+            if key in self._weighted:
+                self._weighted.move_to_end(key)
+                return self._weighted[key]
+            _, _, rows = self.plan(options, fixed_nums, excluded_nums, cold_set)
+            weighted = WeightedRows(self, rows, number_weights, affinity=affinity)
+            _remember(self._weighted, key, weighted, self.max_cached)
+            return weighted
+
+
+class WeightedRows:
+    """후보 행과, 번호 가중치의 곱(affinity를 주면 동반 출현 배수까지)으로 만든 행별 누적 가중치.
+
+    누적합을 한 번 만들어 두면 게임 하나를 뽑는 데는 이분 탐색 한 번이면 되므로,
+    후보가 수백만 개여도 추출 비용은 뽑는 게임 수에만 비례한다.
+    """
+
+    def __init__(
+        self,
+        table: CombinationTable,
+        rows: np.ndarray,
+        number_weights: list,
+        affinity: "CooccurrenceIndex | None" = None,
+        chunk_size: int = 1_000_000,
+    ):
+        self.table = table
+        self.rows  = rows
+        weight_lut = np.array([0.0] + list(number_weights))
+        weights    = np.empty(len(rows))
+        for start in range(0, len(rows), chunk_size):
+            stop = start + chunk_size
+            sub  = table.combos[rows[start:stop]]
+            weights[start:stop] = weight_lut[sub].prod(axis=1)
+            if affinity is not None:
+                weights[start:stop] *= affinity.affinity_factors(sub)
+        self.cumulative = np.cumsum(weights, out=weights)
+        self.cumulative.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def sample(
+        self,
+        count: int,
+        options: dict,
+        rng: np.random.Generator | None = None,
+        first_index: int = 0,
+    ) -> list:
+        """후보 행 중에서 가중치에 비례하는 확률로 count개 조합을 추출.
+
+        first_index는 첫 게임의 전체 순번으로, 이어지는 번호 규칙이 적용될 자리를 정한다.
+        규칙 자리는 연속 번호가 없는 행을 1 - CONSECUTIVE_REJECT 확률로만 받아 다시 뽑는다.
+        """
+        rng = rng or np.random.default_rng()
+        picked = np.empty(count, dtype=np.int64)
+        soft_slots = consecutive_slots(first_index, count, options)
+        picked[~soft_slots] = self._draw(int((~soft_slots).sum()), rng)
+
+        consec_bit = FILTER_BITS["use_consecutive"]
+        open_slots = np.flatnonzero(soft_slots)
+        while len(open_slots):
+            draws = self._draw(len(open_slots), rng)
+            ok = ((self.table.bits[self.rows[draws]] & consec_bit) != 0) | (
+                rng.random(len(draws)) >= CONSECUTIVE_REJECT
+            )
+            picked[open_slots[ok]] = draws[ok]
+            open_slots = open_slots[~ok]
+        return self.table.combos[self.rows[picked]].tolist()
+
+    def _draw(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        targets = rng.random(size) * self.cumulative[-1]
+        return np.minimum(np.searchsorted(self.cumulative, targets, side="right"), len(self.rows) - 1)
+
+
+def _condition_key(options: dict, fixed_nums: list, excluded_nums: list, cold_set: set) -> tuple:
+    """후보 행을 결정하는 조건만 모은 캐시 키 (흐름 가중치 등 가중치 옵션은 제외)."""
+    use_cold = bool(options.get("use_cold"))
+    return (
+        required_bits(options),
+        use_cold,
+        tuple(sorted(set(fixed_nums))),
+        tuple(sorted(set(excluded_nums))),
+        tuple(sorted(cold_set)) if use_cold else (),
+    )
+
+
+def _remember(cache: OrderedDict, key, value, max_entries: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+
+
+def consecutive_slots(first_index: int, count: int, options: dict) -> np.ndarray:
+    """게임 순번 first_index부터 count개 중 이어지는 번호 규칙이 적용되는 자리 (세트마다 앞 3게임)."""
+    if not options.get("use_consecutive"):
+        return np.zeros(count, dtype=bool)
+    return (np.arange(first_index, first_index + count) % GAMES_PER_SET) < CONSECUTIVE_GAMES
+
+
+# ==========================================
+# [4] 가중 비복원 추출
+# ==========================================
+class WeightedSubsetSampler:
+    """pool에서 서로 다른 k개를 가중치 곱에 비례하는 확률로 뽑는 정확한 비복원 추출기.
+
+    random.choices로 뽑고 중복이면 버리는 방식이 수렴하는 분포(P(S) ∝ Π w_i)와
+    같은 분포를 기본대칭다항식 테이블로 한 번에 뽑는다. 중복으로 버리는 시도가 없다.
+    """
+
+    def __init__(self, pool: list, weights: list, k: int):
+        self.pool = np.asarray(pool, dtype=np.int16)
+        self.k    = k
+        w = np.asarray(weights, dtype=float)
+        n = len(w)
+
+        # esp[i, j] = w[i:] 에서 j개를 고르는 모든 경우의 가중치 곱의 합
+        esp = np.zeros((n + 1, k + 1))
+        esp[n, 0] = 1.0
+        for i in range(n - 1, -1, -1):
+            esp[i, 0]  = 1.0
+            esp[i, 1:] = esp[i + 1, 1:] + w[i] * esp[i + 1, :-1]
+        if esp[0, k] <= 0:
+            raise ValueError(f"가중치가 있는 번호가 {k}개보다 적습니다.")
+
+        # include[i, j] = 아직 j개를 더 골라야 할 때 i번째 번호를 포함할 확률
+        with np.errstate(divide="ignore", invalid="ignore"):
+            include = w[:, None] * esp[1:, :-1] / esp[:-1, 1:]
+        self.include = np.concatenate([np.zeros((n, 1)), np.nan_to_num(include)], axis=1)
+
+    def draw(self, rng=random) -> list:
+        """오름차순이 아닌 pool 순서로 서로 다른 k개를 반환 (rng는 random 모듈 호환 객체)."""
+        picks, left = [], self.k
+        for i, num in enumerate(self.pool.tolist()):
+            if left == 0:
+                break
+            if rng.random() < self.include[i, left]:
+                picks.append(num)
+                left -= 1
+        return picks
+
+    def draw_batch(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        """(size, k) 배열로 한 번에 추출. 각 행은 pool 순서를 따른다."""
+        left  = np.full(size, self.k)
+        picks = np.zeros((size, self.k), dtype=np.int16)
+        rows  = np.arange(size)
+        for i, num in enumerate(self.pool.tolist()):
+            take = rng.random(size) < self.include[i, left]
+            picks[rows[take], self.k - left[take]] = num
+            left -= take
+        return picks
+
+
+# ==========================================
+# [5] 배치 후보 생성 (N x 6 배열 단위)
+# ==========================================
+def batch_candidates(
+    sampler: WeightedSubsetSampler,
+    fixed_nums: list,
+    size: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """가중 비복원 추출로 후보 size개를 한 번에 만들어 고정 번호와 합친 정렬 배열 반환."""
+    picks = sampler.draw_batch(size, rng)
+    fixed = np.broadcast_to(np.asarray(fixed_nums, dtype=np.int16), (size, len(fixed_nums)))
+    candidates = np.hstack([fixed, picks])
+    candidates.sort(axis=1)
+    return candidates
+
+
+def generate_batch_games(
+    pool: list,
+    pool_weights: list,
+    fixed_nums: list,
+    options: dict,
+    cold_set: set,
+    count: int,
+    rng: np.random.Generator | None = None,
+    batch_size: int = 100_000,
+    max_batches: int = 20,
+    first_index: int = 0,
+    affinity: "CooccurrenceIndex | None" = None,
+) -> list:
+    """후보를 batch_size개씩 배열로 만들어 켜진 필터를 벡터 연산으로 적용하고 통과한 행만 채택.
+
+    affinity(동반 출현 색인)를 주면 필터를 통과한 행을 동반 출현 배수 / AFFINITY_MAX 확률로
+    다시 채택해, 결과 분포가 번호 가중치 곱 × 동반 출현 배수에 비례하게 한다.
+    max_batches 안에 count개를 채우지 못하면 채운 만큼만 반환한다.
+    """
+    rng      = rng or np.random.default_rng()
+    sampler  = WeightedSubsetSampler(pool, pool_weights, 6 - len(fixed_nums))
+    required = required_bits(options)
+    cold_lut = number_lut(cold_set) if options.get("use_cold") and cold_set else None
+
+    # 이어지는 번호 규칙 자리는 연속 번호가 있거나 30% 확률을 통과한 행으로만 채움
+    soft_slots = consecutive_slots(first_index, count, options)
+    soft_games, plain_games = [], []
+    soft_target, plain_target = int(soft_slots.sum()), int((~soft_slots).sum())
+
+    for _ in range(max_batches):
+        candidates = batch_candidates(sampler, fixed_nums, batch_size, rng)
+        bits = filter_bits(candidates)
+        keep = (bits & required) == required
+        if cold_lut is not None:
+            keep &= cold_lut[candidates].any(axis=1)
+        accepted, accepted_bits = candidates[keep], bits[keep]
+        if affinity is not None:
+            ok = rng.random(len(accepted)) * AFFINITY_MAX < affinity.affinity_factors(accepted)
+            accepted, accepted_bits = accepted[ok], accepted_bits[ok]
+
+        # 행을 앞에서부터 소비: 규칙 자리를 다 채운 지점 이후의 행만 일반 자리에 쓴다
+        consumed = 0
+        if len(soft_games) < soft_target:
+            soft_ok = (
+                (accepted_bits & FILTER_BITS["use_consecutive"]) != 0
+            ) | (rng.random(len(accepted)) >= CONSECUTIVE_REJECT)
+            picked = np.flatnonzero(soft_ok)[:soft_target - len(soft_games)]
+            soft_games.extend(accepted[picked].tolist())
+            consumed = picked[-1] + 1 if len(soft_games) == soft_target else len(accepted)
+
+        plain_games.extend(accepted[consumed:][:plain_target - len(plain_games)].tolist())
+        if len(soft_games) == soft_target and len(plain_games) == plain_target:
+            break
+
+    # 자리 순서대로 다시 배치 (다 채우지 못한 자리는 뒤에서부터 비움)
+    soft_iter, plain_iter = iter(soft_games), iter(plain_games)
+    games = []
+    for is_soft in soft_slots.tolist():
+        game = next(soft_iter if is_soft else plain_iter, None)
+        if game is None:
+            break
+        games.append(game)
+    return games
+
+
+# ==========================================
+# [6] 조합 순위 인코딩 (6-of-45 ↔ 정수 1개)
+# ==========================================
+# 정렬된 6개 번호를 사전순 순위 [0, 8,145,060)로 바꾼다. 순위는 CombinationTable의 행 번호와 같다.
+# _RANK_OFFSET[i, v] = i번째 자리(0부터)에 v보다 작은 번호가 왔을 때 앞서는 조합 수의 누적합
+_RANK_OFFSET = np.zeros((6, 47), dtype=np.int64)
+for _i in range(6):
+    for _v in range(1, 46):
+        _RANK_OFFSET[_i, _v + 1] = _RANK_OFFSET[_i, _v] + comb(45 - _v, 5 - _i)
+
+# 시트 셀에 저장하는 압축 형식: 순위를 3바이트(24비트)씩 이어 붙인 base64 (게임당 4글자)
+TICKET_CODEC_PREFIX = "r24:"
+
+
+def rank_tickets(tickets) -> np.ndarray:
+    """정렬된 (N, 6) 번호 배열(또는 리스트)을 사전순 순위 uint32 배열로 변환."""
+    c = np.asarray(tickets, dtype=np.int64).reshape(-1, 6)
+    if c.size and (
+        (c[:, 0] < 1).any() or (c[:, -1] > 45).any() or (np.diff(c, axis=1) <= 0).any()
+    ):
+        raise ValueError("게임은 1~45 사이 서로 다른 번호 6개를 오름차순으로 담아야 합니다.")
+    prev = np.hstack([np.zeros((len(c), 1), dtype=np.int64), c[:, :-1]])
+    positions = np.arange(6)
+    ranks = (_RANK_OFFSET[positions, c] - _RANK_OFFSET[positions, prev + 1]).sum(axis=1)
+    return ranks.astype(np.uint32)
+
+
+def unrank_tickets(ranks) -> np.ndarray:
+    """사전순 순위 배열을 정렬된 (N, 6) 번호 배열(uint8)로 복원."""
+    r = np.asarray(ranks, dtype=np.int64).reshape(-1)
+    if r.size and ((r < 0).any() or (r >= TOTAL_COMBINATIONS).any()):
+        raise ValueError("조합 순위가 범위를 벗어났습니다.")
+    tickets = np.empty((len(r), 6), dtype=np.uint8)
+    prev = np.zeros(len(r), dtype=np.int64)
+    for i in range(6):
+        base   = _RANK_OFFSET[i, prev + 1]
+        number = np.searchsorted(_RANK_OFFSET[i], r + base, side="right") - 1
+        r      = r - (_RANK_OFFSET[i, number] - base)
+        tickets[:, i] = number
+        prev = number
+    return tickets
+
+
+def encode_tickets(ranks) -> str:
+    """순위 배열을 시트 셀에 넣을 압축 문자열로 변환."""
+    r = np.asarray(ranks, dtype=">u4").reshape(-1)
+    packed = r.view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
+    return TICKET_CODEC_PREFIX + base64.b64encode(packed).decode("ascii")
+
+
+def decode_tickets(value) -> np.ndarray:
+    """시트 셀/로컬 파일 값을 순위 배열로 변환. 압축 문자열, 예전 JSON 문자열, 번호 리스트 모두 허용."""
+    if isinstance(value, str) and value.startswith(TICKET_CODEC_PREFIX):
+        packed = np.frombuffer(base64.b64decode(value[len(TICKET_CODEC_PREFIX):]), dtype=np.uint8)
+        padded = np.zeros((len(packed) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = packed.reshape(-1, 3)
+        ranks = padded.reshape(-1).view(">u4").astype(np.uint32)
+        if (ranks >= TOTAL_COMBINATIONS).any():
+            raise ValueError("조합 순위가 범위를 벗어났습니다.")
+        return ranks
+    games = json.loads(value) if isinstance(value, str) else value
+    return rank_tickets([sorted(game) for game in games])
+
+
+# ==========================================
+# [7] 비트셋 당첨 판정
+# ==========================================
+# 게임과 당첨 번호를 45비트 정수(번호 n → n-1번째 비트)로 표현해 AND + popcount로 비교
+_NUMBER_BITS = np.zeros(46, dtype=np.uint64)
+_NUMBER_BITS[1:] = np.uint64(1) << np.arange(45, dtype=np.uint64)
+
+# (맞춘 개수 * 2 + 보너스 포함 여부) → 등수 (낙첨은 0)
+_TIER_LUT = np.zeros(14, dtype=np.uint8)
+_TIER_LUT[[12, 13]] = 1
+_TIER_LUT[11] = 2
+_TIER_LUT[10] = 3
+_TIER_LUT[[8, 9]] = 4
+_TIER_LUT[[6, 7]] = 5
+
+
+def ticket_masks(tickets) -> np.ndarray:
+    """(N, 6) 번호 배열을 게임별 45비트 마스크(uint64) 배열로 변환."""
+    c = np.asarray(tickets, dtype=np.int64).reshape(-1, 6)
+    return np.bitwise_or.reduce(_NUMBER_BITS[c], axis=1)
+
+
+def masks_from_ranks(ranks) -> np.ndarray:
+    """조합 순위 배열을 게임별 45비트 마스크 배열로 변환."""
+    return ticket_masks(unrank_tickets(ranks))
+
+
+def draw_mask(numbers) -> int:
+    """당첨 번호 6개의 45비트 마스크."""
+    return int(np.bitwise_or.reduce(_NUMBER_BITS[list(numbers)]))
+
+
+def mask_numbers(mask: int) -> list:
+    """45비트 마스크를 오름차순 번호 리스트로 복원."""
+    return [n for n in range(1, 46) if mask >> (n - 1) & 1]
+
+
+def match_tickets(masks: np.ndarray, win_mask, bonus) -> tuple[np.ndarray, np.ndarray]:
+    """게임별 (맞춘 개수, 보너스 번호 포함 여부) 배열. 당첨 마스크/보너스는 게임별 배열이어도 된다."""
+    matched   = np.bitwise_count(masks & np.asarray(win_mask, dtype=np.uint64))
+    has_bonus = (masks & _NUMBER_BITS[bonus]) != 0
+    return matched, has_bonus
+
+
+def classify_tiers(masks: np.ndarray, win_mask, bonus) -> np.ndarray:
+    """게임별 등수 배열 (1~5등, 낙첨은 0)."""
+    matched, has_bonus = match_tickets(masks, win_mask, bonus)
+    return _TIER_LUT[matched.astype(np.int64) * 2 + has_bonus]
+
+
+class DrawIndex:
+    """API에 있는 모든 회차의 당첨 결과를 회차 번호로 바로 찾는 색인.
+
+    회차 번호를 그대로 배열 위치로 쓰는 직접 주소 방식이라, 조회 비용이 회차 수와 무관하다.
+    """
+
+    def __init__(self, episodes, numbers, bonus):
+        self.episodes = np.asarray(episodes, dtype=np.int32)
+        self.masks    = ticket_masks(np.sort(np.asarray(numbers).reshape(-1, 6), axis=1))
+        self.bonus    = np.asarray(bonus, dtype=np.uint8)
+        self._rows    = np.full(int(self.episodes.max(initial=0)) + 1, -1, dtype=np.int32)
+        self._rows[self.episodes] = np.arange(len(self.episodes), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.episodes)
+
+    def __contains__(self, epsd) -> bool:
+        return 0 <= epsd < len(self._rows) and self._rows[epsd] >= 0
+
+    def get(self, epsd: int):
+        """(당첨 마스크, 보너스 번호). 없는 회차면 None."""
+        if epsd not in self:
+            return None
+        row = self._rows[epsd]
+        return int(self.masks[row]), int(self.bonus[row])
+
+    def classify(self, epsd: int, masks: np.ndarray) -> np.ndarray:
+        """해당 회차 결과로 게임 마스크 배열의 등수를 판정."""
+        win_mask, bonus = self.get(epsd)
+        return classify_tiers(masks, win_mask, bonus)
+
+
+# ==========================================
+# [8] 게임 생성기
+# ==========================================
+FILTER_LABELS = {
+    "use_trend":           "🔥 흐름 가중치",
+    "use_overdue":         "⏳ 장기 미출 가중치",
+    "use_pair":            "🤝 동반 출현 가중치",
+    "use_cold":            "❄️ 미출수 부활",
+    "use_omr":             "📝 OMR 편중 차단",
+    "use_end_digit":       "⚡ 끝자리 일치",
+    "use_dead_zone":       "☠️ 제외 구간",
+    "use_stats":           "📊 통계 정밀 거르기",
+    "use_consecutive":     "🔗 이어지는 번호",
+    "use_prime":           "🔢 소수 필터",
+    "use_ac":              "📐 AC값 필터",
+    "use_section_balance": "⚖️ 구간 합 균형",
+    "use_multiple":        "✖️ 배수 편중 차단",
+}
+
+
+def number_weights(full_data, weight_percent: int, use_trend: bool, overdue: "GapIndex | None" = None) -> list:
+    """번호 1~45의 추출 가중치. 흐름 가중치를 쓰면 최근 15회 출현 번호에 weight_percent%를 더 얹는다.
+
+    overdue(출현 간격 색인)를 주면 평균 간격보다 오래 안 나온 번호에 밀린 정도만큼
+    weight_percent%를 최대 2배까지 더 얹는다.
+    """
+    extra = weight_percent / 100.0
+    if not use_trend:
+        weights = [1.0] * 45
+    else:
+        trend_weights = LottoAI().analyze_recent_trend(full_data, scope=15)
+        weights = [
+            trend_weights.get(i, 1.0) + extra if trend_weights.get(i, 1.0) > 1.0
+            else 1.0
+            for i in range(1, 46)
+        ]
+    if overdue is not None:
+        weights = [w + extra * float(score) for w, score in zip(weights, overdue.overdue_scores())]
+    return weights
+
+
+# 1게임씩 뽑는 완화 방식의 단계: (이 단계에서 뽑을 후보 수, 이 단계에서 끌 필터)
+RELAXATION_LADDER = [(2_000, None)] + [(1_000, key) for key in RELAXATION_ORDER]
+
+RELAXED_NOTICE = ("info", "💡 일부 필터 조합이 까다로워 AI가 조건을 단계적으로 완화하여 번호를 생성했습니다.")
+
+
+class GameGenerator:
+    """가중치, 번호 풀, 미출수, 필터 완화 계획을 한 번 계산해 두고 게임을 만들어내는 생성기.
+
+    Streamlit에 의존하지 않고 난수 상태도 인스턴스마다 따로 가지므로 워커 프로세스에서도
+    그대로 쓸 수 있다. 사용자에게 보여줄 안내는 (레벨, 메시지) 형태로 notices에 모은다.
+    table이 없으면 완화 계획 없이 options를 그대로 쓰며 engine은 "batch"여야 한다.
+    full_data는 최신순 당첨 번호 목록이나, 미리 만들어 둔 FrequencyIndex.
+    gaps(출현 간격 색인)와 cooccurrence(동반 출현 색인)를 주지 않으면 필요할 때 full_data에서 만든다.
+    """
+
+    def __init__(
+        self,
+        full_data,
+        weight_percent: int,
+        options: dict,
+        fixed_nums: list,
+        excluded_nums: list,
+        table: CombinationTable | None = None,
+        engine: str = "table",
+        seed=None,
+        gaps: "GapIndex | None" = None,
+        cooccurrence: "CooccurrenceIndex | None" = None,
+    ):
+        ai = LottoAI()
+        full_data    = as_frequency_index(full_data)
+        self.gaps    = gaps if gaps is not None else GapIndex.from_history(full_data)
+        self.cooccurrence = None
+        if options.get("use_pair"):
+            self.cooccurrence = (
+                cooccurrence if cooccurrence is not None else CooccurrenceIndex.from_history(full_data)
+            )
+        self.ai      = ai
+        self.engine  = engine if table is not None else "batch"
+        self.table   = table
+        self.rng     = np.random.default_rng(seed)
+        self.py_rng  = random.Random(int(self.rng.integers(2**63)))
+        self.notices = []
+
+        base_weights = number_weights(
+            full_data, weight_percent, options["use_trend"],
+            overdue=self.gaps if options.get("use_overdue") else None,
+        )
+
+        # 제외 번호 가중치 0 처리
+        self.final_weights = [
+            0.0 if (i in excluded_nums) else base_weights[i - 1]
+            for i in range(1, 46)
+        ]
+
+        self.fixed_nums    = list(fixed_nums)
+        self.excluded_nums = list(excluded_nums)
+        self.pool          = [i for i in range(1, 46) if i not in excluded_nums and i not in fixed_nums]
+        self.pool_weights  = [self.final_weights[i - 1] for i in self.pool]
+        self.needed        = 6 - len(fixed_nums)
+        self.cold_numbers  = self.gaps.cold_numbers(15)
+        self.options       = options
+        self.fallback_game = None
+
+        if self.needed < 0:
+            self.notices.append(("warning", "고정 번호가 6개를 초과합니다. 고정 번호를 줄여주세요."))
+            self.fallback_game = sorted(self.fixed_nums[:6])
+            return
+        if len(self.pool) < self.needed:
+            self.notices.append(("warning", "제외 번호가 너무 많아 6개를 채울 수 없습니다. 제외 번호를 줄여주세요."))
+            self.fallback_game = sorted(self.fixed_nums + self.pool)
+            return
+
+        self.sampler = WeightedSubsetSampler(self.pool, self.pool_weights, self.needed)
+
+        self.candidates = None
+        if table is not None:
+            # 조건을 만족하는 조합 수를 미리 정확히 세어, 필요한 만큼만 필터를 끄고 시작
+            # (같은 조건의 계획과 행별 가중치는 테이블에 기억해 두어 다시 계산하지 않는다)
+            self.options, dropped, rows = table.plan(
+                options, self.fixed_nums, self.excluded_nums, self.cold_numbers
+            )
+            if dropped:
+                self.notices.append((
+                    "info",
+                    "💡 선택한 조건을 모두 만족하는 조합이 없어 다음 필터를 해제했습니다: "
+                    + ", ".join(FILTER_LABELS[key] for key in dropped)
+                    + f" (다시 켜면 가능한 조합 0개 → 해제 후 {len(rows):,}개)",
+                ))
+            if self.engine != "batch":
+                self.candidates = table.weighted_rows(
+                    options, self.fixed_nums, self.excluded_nums, self.cold_numbers, self.final_weights,
+                    affinity=self.cooccurrence,
+                )
+
+        # (필터는 측정된 비용/탈락률에 따라 싸고 잘 거르는 것부터 검사)
+        self.filter_chain = AdaptiveFilterChain(ai, self.cold_numbers)
+        self.diagnostics  = {}
+        self.relaxed_any  = False
+
+    def iter_games(self, count: int, chunk_size: int = 500, first_index: int = 0):
+        """게임 count개를 chunk_size개씩 리스트로 내보내는 제너레이터. first_index는 첫 게임의 순번."""
+        if self.fallback_game is not None:
+            yield [self.fallback_game] * count
+            return
+
+        produced = 0
+        while produced < count:
+            size  = min(chunk_size, count - produced)
+            index = first_index + produced
+            if self.engine == "batch":
+                # 후보 10만 개 단위 배열에 켜진 필터를 한 번에 적용
+                games = generate_batch_games(
+                    self.pool, self.pool_weights, self.fixed_nums, self.options,
+                    self.cold_numbers, size, rng=self.rng, first_index=index,
+                    affinity=self.cooccurrence,
+                )
+            elif len(self.candidates) > 0:
+                # 전체 조합 테이블에서 조건을 모두 만족하는 조합만 골라 가중치대로 바로 추출
+                games = self.candidates.sample(size, self.options, rng=self.rng, first_index=index)
+            else:
+                games = []
+
+            # 다 채우지 못하면 기존 방식대로 조건을 단계적으로 완화
+            while len(games) < size:
+                games.append(self._relaxed_game(index + len(games)))
+
+            produced += len(games)
+            yield games
+
+        if self.relaxed_any and RELAXED_NOTICE not in self.notices:
+            self.notices.append(RELAXED_NOTICE)
+
+    def _relaxed_game(self, game_index: int) -> list:
+        """후보를 1개씩 뽑아 검사하며, 뽑은 수에 따라 필터를 하나씩 끄는 기존 방식으로 1게임 생성."""
+        ai, rng = self.ai, self.py_rng
+        active_options = self.options.copy()
+
+        def draw() -> list:
+            if self.needed == 0:
+                return sorted(self.fixed_nums)
+            return sorted(self.fixed_nums + self.sampler.draw(rng))
+
+        def soft_consecutive(candidate: list) -> bool:
+            return ai.has_consecutive(candidate) or rng.random() >= CONSECUTIVE_REJECT
+
+        # 단계별 조건 완화 (덜 중요한 순서대로, 단계마다 후보 수 제한)
+        for budget, key in RELAXATION_LADDER:
+            if key is not None:
+                active_options[key] = False
+                self.relaxed_any = True
+            stages = self.filter_chain.stages(active_options)
+            if active_options.get("use_consecutive") and game_index % GAMES_PER_SET < CONSECUTIVE_GAMES:
+                stages.append(("use_consecutive", soft_consecutive))
+            for candidate in ai.candidate_stream(draw, stages, self.diagnostics, max_draws=budget):
+                return candidate
+
+        picks = rng.sample(self.pool, min(self.needed, len(self.pool)))
+        self.relaxed_any = True
+        return sorted(self.fixed_nums + picks)
+
+
+# ==========================================
+# [9] 프로세스 풀 병렬 생성
+# ==========================================
+# 이보다 적은 게임은 프로세스를 띄우는 비용이 더 커서 단일 프로세스로 생성
+PARALLEL_MIN_GAMES = 1_000
+
+
+def _generate_worker(args: tuple) -> tuple[list, list, dict]:
+    (full_data, gaps, cooccurrence, weight_percent, options,
+     fixed_nums, excluded_nums, count, first_index, seed) = args
+    generator = GameGenerator(
+        full_data, weight_percent, options, fixed_nums, excluded_nums, engine="batch", seed=seed,
+        gaps=gaps, cooccurrence=cooccurrence,
+    )
+    games = [game for chunk in generator.iter_games(count, first_index=first_index) for game in chunk]
+    return games, generator.notices, generator.diagnostics
+
+
+def iter_games_parallel(
+    generator: GameGenerator,
+    full_data,
+    weight_percent: int,
+    count: int,
+    workers: int | None = None,
+    seed=None,
+):
+    """대량 생성을 프로세스 풀로 나눠 돌리고, 끝나는 순서대로 중복 없는 게임을 내보내는 제너레이터.
+
+    generator는 부모 프로세스에서 완화 계획까지 마친 생성기로, 그 options를 워커에 그대로 넘긴다.
+    워커마다 SeedSequence에서 갈라낸 독립 난수열을 쓰며, 합치면서 겹친 게임은 부모에서 다시 채운다.
+    워커 안내 메시지는 generator.notices에, 진단 정보는 generator.diagnostics에 합친다.
+    """
+    workers = workers or os.cpu_count() or 1
+    if generator.fallback_game is not None or workers < 2 or count < PARALLEL_MIN_GAMES:
+        seen = set()
+        for chunk in generator.iter_games(count):
+            yield _unique_games(chunk, seen)
+        yield from _top_up(generator, seen, count)
+        return
+
+    # 세트(5게임) 경계로 나눠야 이어지는 번호 규칙 자리가 단일 프로세스 생성과 같아진다
+    sets_total = -(-count // GAMES_PER_SET)
+    shares, first_index = [], 0
+    for i in range(workers):
+        sets = sets_total // workers + (1 if i < sets_total % workers else 0)
+        size = min(sets * GAMES_PER_SET, count - first_index)
+        if size > 0:
+            shares.append((first_index, size))
+            first_index += size
+
+    seeds = np.random.SeedSequence(seed).spawn(len(shares))
+    tasks = [
+        (full_data, generator.gaps, generator.cooccurrence, weight_percent, generator.options,
+         generator.fixed_nums, generator.excluded_nums, size, index, child)
+        for (index, size), child in zip(shares, seeds)
+    ]
+    seen = set()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as executor:
+        for future in as_completed([executor.submit(_generate_worker, task) for task in tasks]):
+            games, notices, diagnostics = future.result()
+            generator.notices.extend(n for n in notices if n not in generator.notices)
+            merge_diagnostics(generator.diagnostics, diagnostics)
+            yield _unique_games(games, seen)
+    yield from _top_up(generator, seen, count)
+
+
+def merge_diagnostics(into: dict, other: dict) -> dict:
+    """candidate_stream 진단 정보 other의 뽑은 수/내보낸 수/단계별 탈락 수를 into에 더한다."""
+    for key in ("drawn", "yielded"):
+        into[key] = into.get(key, 0) + other.get(key, 0)
+    rejected = into.setdefault("rejected", {})
+    for name, count in other.get("rejected", {}).items():
+        rejected[name] = rejected.get(name, 0) + count
+    return into
+
+
+def _unique_games(games: list, seen: set) -> list:
+    unique = []
+    for game in games:
+        key = tuple(game)
+        if key not in seen:
+            seen.add(key)
+            unique.append(game)
+    return unique
+
+
+def _top_up(generator: GameGenerator, seen: set, count: int, max_rounds: int = 20):
+    """중복 제거로 모자란 만큼 부모 생성기로 다시 채움.
+
+    조합이 부족해 max_rounds 후에도 다 채우지 못하면 모자란 채로 끝내고 generator.notices에 알린다.
+    """
+    for _ in range(max_rounds):
+        missing = count - len(seen)
+        if missing <= 0 or generator.fallback_game is not None:
+            return
+        for chunk in generator.iter_games(missing, first_index=len(seen)):
+            yield _unique_games(chunk, seen)
+    if len(seen) < count:
+        generator.notices.append((
+            "warning",
+            f"⚠️ 조건을 만족하는 서로 다른 조합이 부족해 요청한 {count:,}게임 중 {len(seen):,}게임만 "
+            "생성했습니다. 고정/제외 번호나 필터를 줄이면 더 많이 만들 수 있습니다.",
+        ))
+
+
+# ==========================================
+# [10] 회차별 번호 출현 색인
+# ==========================================
+class FrequencyIndex:
+    """회차(최신순) × 번호 누적 출현 횟수 행렬.
+
+    cumulative[i, n]은 최신 회차부터 i개 회차 동안 번호 n이 나온 횟수이므로,
+    어떤 회차 구간의 번호별 빈도든 두 행의 뺄셈 한 번(45칸)으로 구한다.
+    데이터가 새로 받아질 때 한 번만 만들고 여러 세션이 함께 읽는다.
+    """
+
+    def __init__(self, numbers: np.ndarray):
+        numbers = np.asarray(numbers, dtype=np.intp).reshape(-1, 6)
+        hits = np.zeros((len(numbers), 46), dtype=np.int32)
+        hits[np.arange(len(numbers))[:, None], numbers] = 1
+        self.cumulative = np.zeros((len(numbers) + 1, 46), dtype=np.int32)
+        np.cumsum(hits, axis=0, out=self.cumulative[1:])
+        self.cumulative.setflags(write=False)
+
+    @classmethod
+    def from_flat(cls, full_data: list) -> "FrequencyIndex":
+        """최신순으로 번호 6개씩 이어 붙인 목록에서 생성."""
+        return cls(np.asarray(full_data[:len(full_data) // 6 * 6]))
+
+    def __len__(self) -> int:
+        return len(self.cumulative) - 1
+
+    def counts(self, scope: int, start: int = 0) -> np.ndarray:
+        """최신 start번째 회차부터 scope개 회차 동안 번호 1~45의 출현 횟수 (길이 45)."""
+        start = min(start, len(self))
+        stop  = min(start + scope, len(self))
+        return self.cumulative[stop, 1:] - self.cumulative[start, 1:]
+
+    def most_common(self, n: int, scope: int) -> list:
+        """최근 scope 회차 출현 횟수 상위 n개 (번호, 횟수). 횟수가 같으면 작은 번호부터."""
+        counts = self.counts(scope)
+        order  = np.argsort(-counts, kind="stable")[:n]
+        return [(int(i) + 1, int(counts[i])) for i in order]
+
+    def cold_numbers(self, scope: int) -> set:
+        """최근 scope 회차 동안 한 번도 나오지 않은 번호."""
+        return {int(i) + 1 for i in np.flatnonzero(self.counts(scope) == 0)}
+
+    def numbers(self) -> np.ndarray:
+        """최신순 (N, 6) 당첨 번호 (누적 행렬에서 복원)."""
+        hits = np.diff(self.cumulative[:, 1:], axis=0)
+        return (np.nonzero(hits)[1] + 1).reshape(-1, 6)
+
+
+def as_frequency_index(data) -> FrequencyIndex:
+    """FrequencyIndex는 그대로, 최신순 번호 목록은 색인으로 변환."""
+    return data if isinstance(data, FrequencyIndex) else FrequencyIndex.from_flat(data)
+
+
+class DrawAccumulator(abc.ABC):
+    """회차를 오래된 순서로 하나씩 이어 붙여 갱신하는 색인의 공통 부분.
+
+    이미 반영한 회차는 건너뛰므로, 데이터가 갱신될 때마다 extend를 불러도 새로 나온 회차만 반영한다.
+    하위 클래스는 _add(회차, 번호 배열)만 구현한다.
+    """
+
+    def __init__(self):
+        self.latest = 0
+
+    @classmethod
+    def from_history(cls, full_data):
+        """최신순 번호 목록 또는 FrequencyIndex에서 생성 (회차 번호는 오래된 회차부터 1, 2, ...)."""
+        index = cls()
+        for epsd, numbers in enumerate(as_frequency_index(full_data).numbers()[::-1], start=1):
+            index.add_draw(epsd, numbers)
+        return index
+
+    def extend(self, episodes, numbers) -> int:
+        """회차 배열과 (N, 6) 번호 배열 중 아직 반영하지 않은 회차만 오래된 순서로 반영."""
+        episodes = np.asarray(episodes).reshape(-1)
+        numbers  = np.asarray(numbers).reshape(-1, 6)
+        added = 0
+        for row in np.argsort(episodes, kind="stable"):
+            if episodes[row] > self.latest:
+                self.add_draw(int(episodes[row]), numbers[row])
+                added += 1
+        return added
+
+    def add_draw(self, epsd: int, numbers) -> None:
+        if epsd <= self.latest:
+            return
+        self._add(epsd, np.asarray(numbers, dtype=np.intp))
+        self.latest = epsd
+
+    @abc.abstractmethod
+    def _add(self, epsd: int, numbers: np.ndarray) -> None:
+        """회차 하나(epsd, 번호 배열)를 색인에 반영."""
+
+
+class GapIndex(DrawAccumulator):
+    """번호별 마지막 출현 회차와 출현 간격(현재/최장/평균) 색인.
+
+    간격은 회차 수 기준이며, 가장 최근 회차에 나온 번호의 현재 간격은 0이다.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.origin      = 0
+        self.last_seen   = np.zeros(46, dtype=np.int64)
+        self.first_seen  = np.zeros(46, dtype=np.int64)
+        self.appearances = np.zeros(46, dtype=np.int64)
+        self.longest     = np.zeros(46, dtype=np.int64)
+
+    def _add(self, epsd: int, numbers: np.ndarray) -> None:
+        if self.latest == 0:
+            self.origin = epsd - 1
+            self.last_seen[:] = self.origin
+        seen = numbers[self.appearances[numbers] > 0]
+        self.longest[seen] = np.maximum(self.longest[seen], epsd - self.last_seen[seen])
+        self.first_seen[numbers[self.appearances[numbers] == 0]] = epsd
+        self.last_seen[numbers]    = epsd
+        self.appearances[numbers] += 1
+
+    def current_gaps(self) -> np.ndarray:
+        """번호 1~45가 마지막으로 나온 뒤 지난 회차 수 (길이 45)."""
+        return self.latest - self.last_seen[1:]
+
+    def longest_gaps(self) -> np.ndarray:
+        """번호 1~45의 최장 간격 (아직 이어지는 현재 간격 포함)."""
+        return np.maximum(self.longest[1:], self.current_gaps())
+
+    def average_gaps(self) -> np.ndarray:
+        """번호 1~45의 연속 두 출현 사이 평균 간격. 두 번 이상 나오지 않았으면 전체 회차 수."""
+        span  = (self.last_seen - self.first_seen)[1:].astype(float)
+        times = self.appearances[1:] - 1
+        return np.where(times > 0, span / np.maximum(times, 1), float(self.latest - self.origin))
+
+    def cold_numbers(self, scope: int) -> set:
+        """최근 scope 회차 동안 한 번도 나오지 않은 번호."""
+        return {int(i) + 1 for i in np.flatnonzero(self.current_gaps() >= scope)}
+
+    def overdue_scores(self) -> np.ndarray:
+        """번호 1~45가 평균 간격보다 얼마나 오래 안 나왔는지 (현재/평균 - 1, 0~2로 자름)."""
+        return np.clip(self.current_gaps() / np.maximum(self.average_gaps(), 1.0) - 1.0, 0.0, 2.0)
+
+
+class CooccurrenceIndex(DrawAccumulator):
+    """두 번호(45×45 행렬)와 세 번호(희소 dict)가 같은 회차에 함께 나온 횟수 색인."""
+
+    def __init__(self):
+        super().__init__()
+        self.draws   = 0
+        self.pairs   = np.zeros((46, 46), dtype=np.int32)
+        self.triples = {}
+
+    def _add(self, epsd: int, numbers: np.ndarray) -> None:
+        numbers = np.sort(numbers)
+        a, b = numbers[_PAIR_I], numbers[_PAIR_J]
+        self.pairs[a, b] += 1
+        self.pairs[b, a] += 1
+        for triple in combinations(numbers.tolist(), 3):
+            self.triples[triple] = self.triples.get(triple, 0) + 1
+        self.draws += 1
+
+    def top_pairs(self, n: int) -> list:
+        """가장 자주 함께 나온 두 번호 상위 n개 ((번호, 번호), 횟수)."""
+        upper = np.triu(self.pairs[1:, 1:], k=1)
+        order = np.argsort(-upper, axis=None, kind="stable")[:n]
+        return [((int(i) + 1, int(j) + 1), int(upper[i, j])) for i, j in zip(*np.unravel_index(order, upper.shape))]
+
+    def top_triples(self, n: int) -> list:
+        """가장 자주 함께 나온 세 번호 상위 n개 ((번호, 번호, 번호), 횟수)."""
+        return sorted(self.triples.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def affinity(self, combos: np.ndarray, chunk_size: int = 1_000_000) -> np.ndarray:
+        """(N, 6) 조합마다 15쌍의 동반 출현 횟수 합을 무작위 기댓값으로 나눈 값 (평균 1 근처)."""
+        expected = 15 * max(self.draws, 1) * 15 / comb(45, 2)
+        scores = np.empty(len(combos), dtype=float)
+        for start in range(0, len(combos), chunk_size):
+            sub = np.asarray(combos[start:start + chunk_size], dtype=np.intp)
+            scores[start:start + chunk_size] = self.pairs[sub[:, _PAIR_I], sub[:, _PAIR_J]].sum(axis=1)
+        return scores / expected
+
+    def affinity_factors(self, combos: np.ndarray) -> np.ndarray:
+        """동반 출현 가중치로 곱할 조합별 배수 (affinity를 AFFINITY_MIN~AFFINITY_MAX로 자름)."""
+        return np.clip(self.affinity(combos), AFFINITY_MIN, AFFINITY_MAX)
+
+
+# 동반 출현 가중치의 조합별 배수 범위
+AFFINITY_MIN = 0.5
+AFFINITY_MAX = 2.0
@@ -0,0 +1,269 @@
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+
+import numpy as np
+
+from lotto_engine import (
+    COLD_BIT, FILTER_BITS, FILTER_LABELS, TOTAL_COMBINATIONS, CONSECUTIVE_GAMES, CONSECUTIVE_REJECT,
+    GAMES_PER_SET, FrequencyIndex, LottoAI, WeightedSubsetSampler, classify_tiers, draw_mask, filter_bits,
+    number_lut, number_weights, ticket_masks, unrank_tickets,
+)
+
+
+# ==========================================
+# [1] 공통
+# ==========================================
+# 무작위 1게임의 등수별 정확한 확률 (낙첨, 1~5등)
+_TIER_WAYS = [0, 1, 6, 6 * 38, comb(6, 4) * comb(39, 2), comb(6, 3) * comb(39, 3)]
+_TIER_WAYS[0] = TOTAL_COMBINATIONS - sum(_TIER_WAYS)
+BASELINE_TIER_PROBS = np.array(_TIER_WAYS, dtype=float) / TOTAL_COMBINATIONS
+
+# 필터 조합 키: 정적 필터 비트 + 미출수 비트 (이어지는 번호는 확률 규칙이라 따로 계산)
+HARD_FILTERS = [key for key in FILTER_BITS if key != "use_consecutive"] + ["use_cold"]
+KEY_SPACE    = COLD_BIT << 1
+
+
+def cold_bits(tickets: np.ndarray, cold_set: set) -> np.ndarray:
+    """게임별 미출수 비트. 미출수가 없으면 LottoAI.has_cold_number처럼 모두 통과."""
+    if not cold_set:
+        return np.full(len(tickets), COLD_BIT, dtype=np.int64)
+    return np.where(number_lut(cold_set)[tickets].any(axis=1), COLD_BIT, 0)
+
+
+def _superset_sums(hist: np.ndarray) -> np.ndarray:
+    """hist[key, ...]를 모든 마스크 m에 대해 Σ_{key ⊇ m} hist[key]로 바꾸는 변환."""
+    sums = hist.copy()
+    keys = np.arange(len(sums))
+    for bit in range(len(sums).bit_length() - 1):
+        lower = keys[(keys & (1 << bit)) == 0]
+        sums[lower] += sums[lower | (1 << bit)]
+    return sums
+
+
+def _set_rates(sums: np.ndarray, required: int, use_consecutive: bool) -> tuple[float, np.ndarray]:
+    """필수 비트 required를 만족하는 후보의 (수, 한 세트 기준 등수 분포).
+
+    이어지는 번호 규칙이 켜져 있으면 세트당 앞 3게임은 연속 번호가 없는 후보를 30%만 받는다.
+    """
+    plain = sums[required]
+    count = float(plain.sum())
+    if count == 0:
+        return 0.0, np.zeros(6)
+    rates = plain / count
+    if use_consecutive:
+        consec = sums[required | FILTER_BITS["use_consecutive"]]
+        soft   = consec + (1.0 - CONSECUTIVE_REJECT) * (plain - consec)
+        share  = CONSECUTIVE_GAMES / GAMES_PER_SET
+        rates  = share * soft / soft.sum() + (1.0 - share) * rates
+    return count, rates
+
+
+# ==========================================
+# [2] 백테스트
+# ==========================================
+def _backtest_worker(args: tuple) -> np.ndarray:
+    """회차 구간마다 '그 이전 회차만 아는' 상태로 후보를 만들고 실제 결과로 채점한 히스토그램.
+
+    반환: hist[흐름 가중치 사용 여부, 필터 키, 등수]
+    """
+    numbers, bonus, targets, weight_percent, samples, seed = args
+    ai   = LottoAI()
+    rng  = np.random.default_rng(seed)
+    hist = np.zeros((2, KEY_SPACE * 6), dtype=np.int64)
+
+    for k in targets:
+        full_data = numbers[max(0, k - 15):k][::-1].ravel().tolist()
+        cold_set  = ai.get_cold_numbers(full_data, scope=15)
+        win_mask  = draw_mask(numbers[k].tolist())
+
+        for use_trend in (0, 1):
+            weights = number_weights(full_data, weight_percent, bool(use_trend))
+            sampler = WeightedSubsetSampler(list(range(1, 46)), weights, 6)
+            candidates = np.sort(sampler.draw_batch(samples, rng), axis=1)
+
+            keys = filter_bits(candidates).astype(np.int64)
+            keys |= cold_bits(candidates, cold_set)
+            tiers = classify_tiers(ticket_masks(candidates), win_mask, int(bonus[k]))
+            hist[use_trend] += np.bincount(keys * 6 + tiers, minlength=KEY_SPACE * 6)
+    return hist.reshape(2, KEY_SPACE, 6)
+
+
+def run_backtest(
+    numbers: np.ndarray,
+    bonus: np.ndarray,
+    weight_percent: int = 100,
+    samples: int = 20_000,
+    min_history: int = 15,
+    workers: int | None = None,
+    seed=None,
+) -> list:
+    """과거 모든 회차에 대해 필터 조합 2^11가지의 등수별 적중률을 한 번에 계산.
+
+    회차마다 그 이전 회차 데이터만으로 흐름 가중치/미출수를 정하고, 가중 추출한 후보 samples개에
+    모든 필터를 벡터 연산으로 적용해 (필터 키, 등수) 히스토그램을 쌓는다. 필터 조합별 결과는
+    상위집합 합 변환으로 히스토그램에서 바로 얻으므로 조합 수만큼 다시 뽑지 않는다.
+    회차는 프로세스 풀로 나눠 처리하며, 워커마다 독립 난수열을 쓴다.
+    numbers, bonus는 회차 오름차순 배열(DrawModel 열을 뒤집은 것)이어야 한다.
+    """
+    workers = workers or os.cpu_count() or 1
+    targets = np.arange(min_history, len(numbers))
+    chunks  = [chunk for chunk in np.array_split(targets, workers * 4) if len(chunk)]
+    seeds   = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks   = [(numbers, bonus, chunk, weight_percent, samples, s) for chunk, s in zip(chunks, seeds)]
+
+    if workers > 1:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            hist = sum(executor.map(_backtest_worker, tasks))
+    else:
+        hist = sum(map(_backtest_worker, tasks))
+
+    results = []
+    for use_trend in (0, 1):
+        sums  = _superset_sums(hist[use_trend])
+        total = float(hist[use_trend].sum())
+        for hard in range(1 << len(HARD_FILTERS)):
+            options = {key: bool(hard >> i & 1) for i, key in enumerate(HARD_FILTERS)}
+            required = sum(
+                COLD_BIT if key == "use_cold" else FILTER_BITS[key]
+                for key, on in options.items() if on
+            )
+            for use_consecutive in (False, True):
+                count, rates = _set_rates(sums, required, use_consecutive)
+                results.append({
+                    "options":    {"use_trend": bool(use_trend), "use_consecutive": use_consecutive, **options},
+                    "episodes":   len(targets),
+                    "acceptance": count / total if total else 0.0,
+                    "tier_rates": {tier: float(rates[tier]) for tier in range(1, 6)},
+                    "hit_rate":   float(rates[1:].sum()),
+                    "lift":       float(rates[1:].sum() / BASELINE_TIER_PROBS[1:].sum()) if count else 0.0,
+                })
+    return results
+
+
+# ==========================================
+# [3] 몬테카를로 필터 효과 추정
+# ==========================================
+def wilson_interval(successes: int, trials: int, z: float = 1.96) -> tuple[float, float]:
+    """이항 비율의 윌슨 신뢰구간 (기본 95%)."""
+    if trials == 0:
+        return 0.0, 1.0
+    p      = successes / trials
+    denom  = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half   = z * (p * (1 - p) / trials + z * z / (4 * trials * trials)) ** 0.5 / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def estimate_filters(
+    options: dict,
+    cold_set: set,
+    samples: int = 2_000_000,
+    batch_size: int = 500_000,
+    seed: int | None = 0,
+) -> dict:
+    """무작위 게임 samples개로 필터별·전체 통과율과, 통과한 게임의 등수 빈도를 신뢰구간과 함께 추정.
+
+    통과한 게임마다 독립적인 무작위 추첨 결과(번호 6개 + 보너스)를 짝지어 채점하므로,
+    등수 빈도를 무작위 1게임의 정확한 확률(BASELINE_TIER_PROBS)과 바로 비교할 수 있다.
+    """
+    active   = tuple(key for key in HARD_FILTERS if options.get(key))
+    rng      = np.random.default_rng(seed)
+    required = sum(COLD_BIT if key == "use_cold" else FILTER_BITS[key] for key in active)
+    passed   = dict.fromkeys(HARD_FILTERS, 0)
+    accepted = 0
+    tiers    = np.zeros(6, dtype=np.int64)
+
+    for start in range(0, samples, batch_size):
+        size    = min(batch_size, samples - start)
+        tickets = unrank_tickets(rng.integers(0, TOTAL_COMBINATIONS, size))
+        keys    = filter_bits(tickets).astype(np.int64)
+        keys   |= cold_bits(tickets, cold_set)
+        for key in HARD_FILTERS:
+            bit = COLD_BIT if key == "use_cold" else FILTER_BITS[key]
+            passed[key] += int(((keys & bit) != 0).sum())
+
+        keep     = (keys & required) == required
+        accepted += int(keep.sum())
+        # 통과 게임마다 무작위 추첨: 45개 중 7개를 뽑아 앞 6개는 당첨 번호, 마지막은 보너스
+        drawn = np.argpartition(rng.random((int(keep.sum()), 45)), 7, axis=1)[:, :7] + 1
+        win_masks = ticket_masks(drawn[:, :6])
+        tiers += np.bincount(
+            classify_tiers(ticket_masks(tickets[keep]), win_masks, drawn[:, 6]), minlength=6
+        )
+
+    result = {
+        "samples":  samples,
+        "filters":  {key: (passed[key] / samples, *wilson_interval(passed[key], samples)) for key in HARD_FILTERS},
+        "joint":    (accepted / samples, *wilson_interval(accepted, samples)),
+        "accepted": accepted,
+        "tiers":    {
+            tier: (int(tiers[tier]) / accepted if accepted else 0.0, *wilson_interval(int(tiers[tier]), accepted))
+            for tier in range(1, 6)
+        },
+        "baseline": {tier: float(BASELINE_TIER_PROBS[tier]) for tier in range(1, 6)},
+    }
+    return result
+
+
+# ==========================================
+# [4] 명령줄 실행
+# ==========================================
+def _describe(options: dict) -> str:
+    labels = [FILTER_LABELS[key] for key, on in options.items() if on]
+    return ", ".join(labels) or "(필터 없음)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인공지능 로또 분석기 시뮬레이션")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    bt = sub.add_parser("backtest", help="과거 전체 회차로 필터 조합별 적중률 백테스트")
+    bt.add_argument("--weight", type=int, default=100, help="흐름 가중치(%%)")
+    bt.add_argument("--samples", type=int, default=20_000, help="회차당 후보 수")
+    bt.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    bt.add_argument("--seed", type=int, default=None)
+    bt.add_argument("--top", type=int, default=20, help="적중률 상위 몇 개 조합을 출력할지")
+    bt.add_argument("--json", dest="json_path", default=None, help="전체 결과를 저장할 JSON 경로")
+    mc = sub.add_parser("estimate", help="무작위 게임으로 필터별 통과율과 등수 빈도 추정")
+    mc.add_argument("--samples", type=int, default=2_000_000)
+    mc.add_argument("--seed", type=int, default=0)
+    mc.add_argument("--off", nargs="*", default=[], choices=HARD_FILTERS, help="끌 필터")
+    args = parser.parse_args()
+
+    from lotto_store import DrawModel, DrawStore
+
+    store = DrawStore()
+    store.refresh()
+    model = DrawModel.from_rows(store.rows)
+    numbers, bonus = model.numbers[::-1], model.bonus[::-1]
+    if args.command == "estimate":
+        options = {key: key not in args.off for key in HARD_FILTERS}
+        est = estimate_filters(options, FrequencyIndex(model.numbers).cold_numbers(15), args.samples, seed=args.seed)
+        for key, (rate, lo, hi) in est["filters"].items():
+            print(f"{FILTER_LABELS[key]}: 통과율 {rate:.3%} ({lo:.3%} ~ {hi:.3%})")
+        rate, lo, hi = est["joint"]
+        print(f"켜진 필터 전체: 통과율 {rate:.3%} ({lo:.3%} ~ {hi:.3%})")
+        for tier, (freq, lo, hi) in est["tiers"].items():
+            print(f"{tier}등: {freq:.3e} ({lo:.3e} ~ {hi:.3e}) | 무작위 {est['baseline'][tier]:.3e}")
+        return
+
+    results = run_backtest(numbers, bonus, args.weight, args.samples, workers=args.workers, seed=args.seed)
+
+    baseline = BASELINE_TIER_PROBS[1:].sum()
+    print(f"회차 {results[0]['episodes']:,}개, 필터 조합 {len(results):,}개 | 무작위 적중률(5등 이상) {baseline:.4%}")
+    ranked = sorted((r for r in results if r["acceptance"] > 0), key=lambda r: r["hit_rate"], reverse=True)
+    for r in ranked[:args.top]:
+        print(f"{r['hit_rate']:.4%} (x{r['lift']:.3f}) 통과율 {r['acceptance']:.2%} | {_describe(r['options'])}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,865 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lotto_engine import DrawIndex, decode_tickets, masks_from_ranks
+
+
+# ==========================================
+# [1] 당첨 결과 API
+# ==========================================
+# 테스트용 스텁 서버 등으로 바꿀 수 있도록 환경 변수로 API 주소를 지정
+API_BASE      = os.environ.get("LOTTO_API_BASE", "https://www.dhlottery.co.kr").rstrip("/")
+DRAW_LIST_URL = API_BASE + "/lt645/selectPstLt645Info.do?srchLtEpsd={epsd}"
+PRIZE_URL     = API_BASE + "/common.do?method=getLottoNumber&drwNo={epsd}"
+
+# 이보다 많은 회차가 밀려 있으면 회차별로 묻지 않고 전체를 한 번에 받음
+MAX_INCREMENTAL_EPISODES = 10
+
+
+class HttpClient:
+    """당첨 결과 API가 함께 쓰는 HTTP 클라이언트.
+
+    연결을 재사용하는 세션 하나로 요청하고, 일시적 오류(429/5xx, 연결 실패)는 지수 백오프로
+    retries번까지 다시 시도한다. 호스트마다 동시 요청을 per_host개로 제한한다.
+    응답에 ETag/Last-Modified가 있으면 본문과 함께 기억해 두었다가 다음 요청을 조건부로 보낸다.
+    304(변경 없음)면 기억해 둔 본문을 그대로 쓴다. 여러 스레드가 함께 써도 된다.
+    """
+
+    def __init__(self, retries: int = 3, backoff: float = 0.5, per_host: int = 4, max_cached: int = 256):
+        retry = Retry(
+            total=retries, backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=per_host, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip, deflate"})
+
+        self.per_host    = per_host
+        self.max_cached  = max_cached
+        self._lock       = threading.Lock()
+        self._host_slots = {}
+        self._validated  = OrderedDict()
+
+    def _slots(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def get_json(self, url: str, timeout: float = 10):
+        """GET 요청의 JSON 본문. 이전 응답과 달라지지 않았으면 서버가 본문을 다시 보내지 않는다."""
+        with self._lock:
+            cached = self._validated.get(url)
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self._slots(url):
+            res = self.session.get(url, headers=headers, timeout=timeout)
+        if res.status_code == 304 and cached:
+            return cached["body"]
+        res.raise_for_status()
+        body = res.json()
+
+        etag, last_modified = res.headers.get("ETag"), res.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self._validated[url] = {"etag": etag, "last_modified": last_modified, "body": body}
+                self._validated.move_to_end(url)
+                while len(self._validated) > self.max_cached:
+                    self._validated.popitem(last=False)
+        return body
+
+
+http_client = HttpClient()
+
+
+def fetch_draw_list(epsd="all") -> list:
+    """당첨 결과를 회차별 dict 목록으로 가져옴. epsd: "all"(전체) 또는 회차 번호."""
+    data = http_client.get_json(DRAW_LIST_URL.format(epsd=epsd)).get("data", {}).get("list", [])
+    if not data and epsd == "all":
+        raise ValueError("API 응답에 데이터가 없습니다.")
+    return data
+
+
+def fetch_draws_since(last_epsd: int) -> list:
+    """last_epsd 이후 회차만 가져옴. 아직 받은 회차가 없거나 많이 밀려 있으면 전체를 받는다."""
+    if last_epsd <= 0:
+        return fetch_draw_list()
+    new_items = []
+    for epsd in range(last_epsd + 1, last_epsd + 1 + MAX_INCREMENTAL_EPISODES):
+        items = [item for item in fetch_draw_list(epsd) if int(item.get("ltEpsd", 0)) >= epsd]
+        if not items:
+            return new_items
+        new_items.extend(items)
+    return [item for item in fetch_draw_list() if int(item.get("ltEpsd", 0)) > last_epsd]
+
+
+# ==========================================
+# [2] 로컬 당첨 결과 저장소
+# ==========================================
+class DrawStore:
+    """회차별 당첨 결과를 (N, 8) int32 배열 [회차, 번호 6개, 보너스]로 담은 .npy 파일.
+
+    지난 회차 결과는 바뀌지 않으므로, 시작할 때 파일(수십 KB)을 바로 읽고
+    API에는 마지막으로 저장한 회차 이후만 묻는다. 파일은 임시 파일에 쓴 뒤 교체한다.
+    (메모리 맵으로 열어 두면 Windows에서 교체가 PermissionError로 실패하므로 통째로 읽는다.)
+    """
+
+    def __init__(self, path: str = "lotto_draws.npy"):
+        self.path  = path
+        self._lock = threading.Lock()
+        self.rows  = self._load()
+
+    def _load(self) -> np.ndarray:
+        if os.path.exists(self.path):
+            try:
+                rows = np.load(self.path)
+                if rows.ndim == 2 and rows.shape[1] == 8:
+                    return rows
+            except (ValueError, OSError):
+                pass
+        return np.zeros((0, 8), dtype=np.int32)
+
+    @property
+    def latest(self) -> int:
+        """저장된 마지막 회차 (없으면 0)."""
+        return int(self.rows[-1, 0]) if len(self.rows) else 0
+
+    def refresh(self) -> int:
+        """API에서 새 회차만 받아 저장. 새로 저장한 회차 수 반환."""
+        with self._lock:
+            new_rows = _draw_rows(fetch_draws_since(self.latest))
+            new_rows = new_rows[new_rows[:, 0] > self.latest]
+            if len(new_rows) == 0:
+                return 0
+            rows = np.concatenate([self.rows, new_rows])
+            rows = rows[np.unique(rows[:, 0], return_index=True)[1]]
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, rows)
+            os.replace(tmp_path, self.path)
+            self.rows = rows
+            return len(new_rows)
+
+
+class DrawModel:
+    """전체 회차 당첨 결과의 읽기 전용 열 단위 모델. 0번 행이 최신 회차.
+
+    데이터 버전(회차 수, 최신 회차)마다 한 번만 만들고 여러 세션이 함께 읽는다.
+    최근 count회 구간은 window로 복사 없는 슬라이스를 내준다.
+    """
+
+    def __init__(self, episodes, numbers, bonus):
+        self.episodes = np.ascontiguousarray(episodes, dtype=np.int32)
+        self.numbers  = np.ascontiguousarray(numbers, dtype=np.uint8).reshape(-1, 6)
+        self.bonus    = np.ascontiguousarray(bonus, dtype=np.uint8)
+        for column in (self.episodes, self.numbers, self.bonus):
+            column.setflags(write=False)
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "DrawModel":
+        """DrawStore의 회차 오름차순 (N, 8) 배열에서 생성."""
+        rows = np.asarray(rows)[::-1]
+        return cls(rows[:, 0], rows[:, 1:7], rows[:, 7])
+
+    def __len__(self) -> int:
+        return len(self.episodes)
+
+    @property
+    def latest(self) -> int:
+        return int(self.episodes[0]) if len(self) else 0
+
+    @property
+    def version(self) -> tuple:
+        """(회차 수, 최신 회차)."""
+        return len(self), self.latest
+
+    def window(self, count: int) -> "DrawModel":
+        """최근 count회만 담은 모델 (원본 배열의 슬라이스)."""
+        return DrawModel(self.episodes[:count], self.numbers[:count], self.bonus[:count])
+
+    def history_info(self) -> list:
+        """화면 표시용 (회차, 번호 6개, 보너스) 목록 (최신순)."""
+        return list(zip(self.episodes.tolist(), self.numbers.tolist(), self.bonus.tolist()))
+
+
+def _draw_rows(items: list) -> np.ndarray:
+    return np.array([
+        [int(item.get("ltEpsd", 0))]
+        + sorted(int(item.get(f"tm{i}WnNo", 0)) for i in range(1, 7))
+        + [int(item.get("bnusNo", 0))]
+        for item in items
+    ], dtype=np.int32).reshape(-1, 8)
+
+
+# ==========================================
+# [3] 회차별 당첨 통계 누적 저장소
+# ==========================================
+class StatsAggregate:
+    """회차별 생성 게임 수, 등수별 당첨 개수, 3등 이상 당첨 게임을 누적 보관하는 저장소.
+
+    생성 이력은 뒤에 행이 추가되기만 하므로, 이미 반영한 레코드 수를 기억해 두고 새로 붙은
+    레코드만 반영한다. 당첨 결과가 아직 없던 회차는 결과가 나온 뒤 한 번만 판정한다.
+    여러 세션이 함께 쓰는 프로세스 단위 객체로, 읽기도 sync와 같은 잠금 안에서 하며
+    변경분은 로컬 JSON 파일에 저장한다.
+    """
+
+    def __init__(self, path: str = "lotto_stats.json"):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._reset()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                self.folded      = int(saved["folded"])
+                self.fingerprint = saved["fingerprint"]
+                self.episodes    = {int(e): v for e, v in saved["episodes"].items()}
+            except (ValueError, KeyError, TypeError, json.JSONDecodeError):
+                self._reset()
+
+    def _reset(self):
+        self.folded      = 0
+        self.fingerprint = None
+        self.episodes    = {}
+
+    def sync(self, records: list, draw_index: DrawIndex) -> None:
+        """아직 반영하지 않은 레코드와, 당첨 결과가 새로 나온 회차만 반영."""
+        with self._lock:
+            changed = False
+            # 이력이 바뀌었으면(시트 초기화, 로컬 파일로 대체 등) 처음부터 다시 집계
+            if len(records) < self.folded or (
+                self.folded and self.fingerprint != _fingerprint(records, self.folded)
+            ):
+                self._reset()
+                changed = True
+
+            for record in records[self.folded:]:
+                entry = self.episodes.setdefault(
+                    record["epsd"], {"games": 0, "tiers": None, "winners": []}
+                )
+                entry["games"] += len(record["ranks"])
+                # 이미 판정이 끝난 회차에 게임이 추가되면 다시 판정
+                entry["tiers"] = None
+                changed = True
+            if len(records) > self.folded:
+                self.folded      = len(records)
+                self.fingerprint = _fingerprint(records, self.folded)
+
+            pending = {
+                epsd for epsd, entry in self.episodes.items()
+                if entry["tiers"] is None and epsd in draw_index
+            }
+            if pending:
+                self._classify(records, pending, draw_index)
+                changed = True
+
+            if changed:
+                self._save()
+
+    def _classify(self, records: list, pending: set, draw_index: DrawIndex):
+        grouped: dict = {}
+        for record in records:
+            if record["epsd"] in pending:
+                grouped.setdefault(record["epsd"], []).append(record["ranks"])
+        for epsd in pending:
+            ranks = np.concatenate(grouped.get(epsd, [np.zeros(0, dtype=np.uint32)]))
+            tiers = draw_index.classify(epsd, masks_from_ranks(ranks))
+            self.episodes[epsd]["tiers"]   = np.bincount(tiers, minlength=6).tolist()
+            self.episodes[epsd]["winners"] = ranks[(tiers >= 1) & (tiers <= 3)].tolist()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "folded":      self.folded,
+                "fingerprint": self.fingerprint,
+                "episodes":    {str(e): v for e, v in self.episodes.items()},
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def games(self, epsd: int) -> int:
+        """해당 회차용으로 생성된 게임 수."""
+        with self._lock:
+            entry = self.episodes.get(epsd)
+            return entry["games"] if entry else 0
+
+    def prize_counts(self, epsd: int) -> dict | None:
+        """해당 회차의 등수별 당첨 개수. 결과가 아직 없거나 생성 기록이 없으면 None."""
+        with self._lock:
+            entry = self.episodes.get(epsd)
+            if not entry or entry["tiers"] is None:
+                return None
+            return _tier_dict(entry["tiers"])
+
+    def winners(self, epsd: int) -> np.ndarray:
+        """해당 회차의 3등 이상 당첨 게임 (조합 순위 배열)."""
+        with self._lock:
+            entry = self.episodes.get(epsd)
+            return np.asarray(entry["winners"] if entry else [], dtype=np.uint32)
+
+    def resolved_episodes(self) -> list:
+        """당첨 결과가 나와 판정을 마친 회차 목록."""
+        with self._lock:
+            return [epsd for epsd, entry in self.episodes.items() if entry["tiers"] is not None]
+
+    def all_time(self) -> tuple[int, dict]:
+        """결과가 나온 모든 회차의 (총 게임 수, 등수별 당첨 개수)."""
+        totals = [0] * 6
+        with self._lock:
+            for entry in self.episodes.values():
+                if entry["tiers"] is not None:
+                    totals = [a + b for a, b in zip(totals, entry["tiers"])]
+        return sum(totals), _tier_dict(totals)
+
+
+def _fingerprint(records: list, count: int) -> list:
+    """앞에서 count번째 레코드의 (회차, 게임 수) — 이력이 그대로 이어지는지 확인하는 용도."""
+    last = records[count - 1]
+    return [last["epsd"], len(last["ranks"])]
+
+
+def _tier_dict(tiers: list) -> dict:
+    return {1: tiers[1], 2: tiers[2], 3: tiers[3], 4: tiers[4], 5: tiers[5], "fail": tiers[0]}
+
+
+# ==========================================
+# [4] 회차별 당첨금 저장소
+# ==========================================
+# 응답에 없는 등수에 쓰는 대략적 1게임당 당첨금 (4·5등은 고정 금액)
+DEFAULT_PRIZES = {1: None, 2: 50_000_000, 3: 1_500_000, 4: 50_000, 5: 5_000}
+FIXED_PRIZES   = {4: 50_000, 5: 5_000}
+
+
+def _amount(value) -> int | None:
+    """"1,234,567원", 1234567.0 같은 금액 표기를 정수로. 해석할 수 없거나 0 이하면 None."""
+    if isinstance(value, str):
+        value = value.replace(",", "").replace("원", "").strip()
+    try:
+        amount = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return amount if amount > 0 else None
+
+
+def parse_prize_amounts(data: dict) -> dict:
+    """응답 dict에서 등수별 1게임당 당첨금을 찾아 {등수: 금액}으로. 없는 등수는 빠진다.
+
+    rnk{t}WnAmt 형식을 우선 보고, 표기가 조금 다른 키와 구 API의 firstWinamnt도 받아들인다.
+    """
+    lowered = {str(key).lower(): value for key, value in data.items()}
+    amounts = {}
+    for tier in range(1, 6):
+        for key in (f"rnk{tier}wnamt", f"rnk{tier}winamt", f"rank{tier}wnamt", f"rnk{tier}wnamnt"):
+            amount = _amount(lowered.get(key))
+            if amount:
+                amounts[tier] = amount
+                break
+    if 1 not in amounts and _amount(lowered.get("firstwinamnt")):
+        amounts[1] = _amount(lowered.get("firstwinamnt"))
+    return amounts
+
+
+def fetch_prize_amounts(epsd: int) -> dict:
+    """회차의 등수별 1게임당 당첨금. 회차 목록 응답을 먼저 보고, 1등이 없으면 구 API로 채운다."""
+    amounts = {}
+    for item in fetch_draw_list(epsd):
+        if int(item.get("ltEpsd", 0)) == epsd:
+            amounts = parse_prize_amounts(item)
+            break
+    if 1 not in amounts:
+        data = http_client.get_json(PRIZE_URL.format(epsd=epsd), timeout=5)
+        if data.get("returnValue") == "success":
+            amounts = {**parse_prize_amounts(data), **amounts}
+    if 1 in amounts:
+        amounts = {**FIXED_PRIZES, **amounts}
+    return amounts
+
+
+class PrizeStore:
+    """회차별 등수 당첨금을 로컬 JSON 파일에 기한 없이 보관하는 저장소.
+
+    지난 회차 당첨금은 바뀌지 않으므로 1~5등이 모두 모인 회차는 다시 묻지 않는다.
+    빠진 회차는 prefetch가 백그라운드 스레드에서 최대 workers개씩 동시에 받아 채우므로,
+    get은 네트워크를 기다리지 않고 저장된 값(없으면 DEFAULT_PRIZES)을 바로 돌려준다.
+    받지 못했거나 아직 발표 전이라 빠진 등수가 있는 회차는 retry_delay초부터 두 배씩,
+    최대 max_retry_delay초 간격으로 다시 시도한다.
+    """
+
+    def __init__(
+        self,
+        path: str = "lotto_prizes.json",
+        workers: int = 4,
+        retry_delay: float = 60.0,
+        max_retry_delay: float = 60 * 60,
+    ):
+        self.path    = path
+        self.workers = workers
+        self.retry_delay     = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.amounts = {}
+        self._lock     = threading.Lock()
+        self._fetching = set()
+        self._retries  = {}  # 회차 → (실패 횟수, 다음 시도 시각)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                self.amounts = {
+                    int(epsd): {int(tier): int(amount) for tier, amount in tiers.items()}
+                    for epsd, tiers in saved.items()
+                }
+            except (ValueError, AttributeError, json.JSONDecodeError):
+                self.amounts = {}
+
+    def complete(self, epsd: int) -> bool:
+        return len(self.amounts.get(epsd, {})) == 5
+
+    def get(self, epsd: int) -> dict:
+        """{등수: 1게임당 당첨금}. 아직 모르는 등수는 DEFAULT_PRIZES 값 (1등은 None)."""
+        return {**DEFAULT_PRIZES, **self.amounts.get(epsd, {})}
+
+    def estimated(self, epsd: int) -> list:
+        """실제 금액을 아직 받지 못해 get이 DEFAULT_PRIZES의 대략적인 값으로 채운 등수 (고정 금액 등수 제외)."""
+        known = self.amounts.get(epsd, {})
+        return [
+            tier for tier, amount in DEFAULT_PRIZES.items()
+            if amount is not None and tier not in FIXED_PRIZES and tier not in known
+        ]
+
+    def prefetch(self, episodes) -> None:
+        """아직 다 모이지 않은 회차를 백그라운드에서 받아 둔다. 실패한 회차는 다음 시도 시각이 지나야 다시 묻는다."""
+        now = time.monotonic()
+        with self._lock:
+            todo = [
+                e for e in dict.fromkeys(int(e) for e in episodes)
+                if not self.complete(e) and e not in self._fetching
+                and self._retries.get(e, (0, now))[1] <= now
+            ]
+            self._fetching.update(todo)
+        if todo:
+            threading.Thread(target=self._fetch_all, args=(todo,), daemon=True).start()
+
+    def _fetch_all(self, episodes: list):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = executor.map(_fetch_prize_quietly, episodes)
+            for epsd, amounts in zip(episodes, results):
+                with self._lock:
+                    if amounts:
+                        self.amounts[epsd] = {**self.amounts.get(epsd, {}), **amounts}
+                    if self.complete(epsd):
+                        self._retries.pop(epsd, None)
+                    else:
+                        failures = self._retries.get(epsd, (0, 0.0))[0] + 1
+                        delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+                        self._retries[epsd] = (failures, time.monotonic() + delay)
+                    self._fetching.discard(epsd)
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({str(e): tiers for e, tiers in self.amounts.items()}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _fetch_prize_quietly(epsd: int) -> dict:
+    try:
+        return fetch_prize_amounts(epsd)
+    except Exception:
+        return {}
+
+
+# ==========================================
+# [5] 추첨 일정 기반 백그라운드 갱신
+# ==========================================
+KST = timezone(timedelta(hours=9))
+# 1회 추첨 (2002-12-07 토요일). 이후 매주 토요일 같은 시각에 추첨
+DRAW_EPOCH = datetime(2002, 12, 7, 20, 35, tzinfo=KST)
+
+AFTER_DRAW_INTERVAL = 5 * 60       # 추첨이 끝났는데 결과가 아직 없을 때
+STALE_INTERVAL      = 30 * 60      # 예정 추첨 뒤 하루가 지나도 결과가 없을 때 (휴방 등)
+IDLE_INTERVAL       = 6 * 60 * 60  # 다음 추첨까지 기다리는 동안
+
+
+def draw_time(epsd: int) -> datetime:
+    """회차의 추첨 시각 (KST)."""
+    return DRAW_EPOCH + timedelta(weeks=epsd - 1)
+
+
+def next_poll_delay(now: datetime, latest: int) -> float:
+    """latest회까지 받은 상태에서 다음 확인까지 기다릴 초. 받은 회차가 없으면 결과 대기 때처럼 자주 확인."""
+    if latest <= 0:
+        return AFTER_DRAW_INTERVAL
+    overdue = (now - draw_time(latest + 1)).total_seconds()
+    if overdue >= 24 * 60 * 60:
+        return STALE_INTERVAL
+    if overdue >= 0:
+        return AFTER_DRAW_INTERVAL
+    return min(max(-overdue, AFTER_DRAW_INTERVAL), IDLE_INTERVAL)
+
+
+class DrawRefresher:
+    """추첨 일정에 맞춰 새 회차를 확인하는 백그라운드 스레드.
+
+    토요일 추첨 직후에는 결과가 나올 때까지 자주, 그 밖에는 드물게 저장소를 갱신한다.
+    새 회차가 저장되면 DrawModel을 새로 만들어 model 참조 하나만 바꿔 끼우므로, 요청 쪽은
+    model을 읽기만 하고 네트워크를 기다리지 않는다 (옛 모델이나 새 모델 중 하나를 온전히 본다).
+    """
+
+    def __init__(self, store: DrawStore):
+        self.store        = store
+        self.model        = DrawModel.from_rows(store.rows)
+        self.last_checked = None
+        self.last_error   = None
+        self._stop        = threading.Event()
+        self._thread      = None
+
+    def refresh_now(self) -> int:
+        """지금 바로 새 회차를 확인해 반영. 새로 저장한 회차 수 반환."""
+        try:
+            added = self.store.refresh()
+            if added or len(self.model) != len(self.store.rows):
+                self.model = DrawModel.from_rows(self.store.rows)
+            self.last_error = None
+            return added
+        except Exception as e:
+            self.last_error = e
+            return 0
+        finally:
+            self.last_checked = datetime.now(KST)
+
+    def start(self) -> "DrawRefresher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="draw-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # 시작하자마자 한 번 확인하고(시작 전에 refresh_now로 이미 확인했으면 건너뜀),
+        # 이후에는 추첨 일정에 맞춘 간격으로 확인
+        if self.last_checked is None:
+            self.refresh_now()
+        while not self._stop.wait(next_poll_delay(datetime.now(KST), self.store.latest)):
+            self.refresh_now()
+
+
+# ==========================================
+# [6] 생성 이력 시트 캐시
+# ==========================================
+_RANGE_ROWS = re.compile(r"[A-Za-z]+(\d+)(?::[A-Za-z]+(\d+))?$")
+
+
+def parse_history_row(row: list) -> dict | None:
+    """시트 한 행 [회차, 압축 게임]을 이력 레코드로. 해석할 수 없는 행이면 None."""
+    if len(row) < 2:
+        return None
+    try:
+        return {"epsd": int(row[0]), "ranks": decode_tickets(row[1])}
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return None
+
+
+def appended_rows(response) -> tuple[int, int] | None:
+    """append 응답의 updates.updatedRange에서 추가된 (첫 행, 마지막 행) 번호. 알 수 없으면 None."""
+    try:
+        updated = response["updates"]["updatedRange"]
+    except (TypeError, KeyError):
+        return None
+    match = _RANGE_ROWS.search(updated.rsplit("!", 1)[-1])
+    if not match:
+        return None
+    first = int(match.group(1))
+    return first, int(match.group(2) or first)
+
+
+def verify_append(response, rows: list) -> None:
+    """append 응답만으로 rows가 모두 추가됐는지 확인. 시트를 다시 읽지 않으므로 시트 크기와 무관하다.
+
+    추가된 행 수(updates.updatedRows)와 범위(updates.updatedRange)가 요청과 맞지 않으면 ValueError.
+    """
+    span = appended_rows(response)
+    updated_rows = response.get("updates", {}).get("updatedRows") if isinstance(response, dict) else None
+    if span is None or updated_rows != len(rows) or span[1] - span[0] + 1 != len(rows):
+        raise ValueError(f"검증 실패: 요청 {len(rows)}행, 응답 {updated_rows}행 ({span})")
+
+
+class HistoryCache:
+    """생성 이력 시트의 프로세스 단위 캐시.
+
+    처음 한 번만 시트 전체를 읽고, 이후에는 sync_every초마다 이미 아는 행 뒤(A{n+1}:B)만
+    범위로 읽어 다른 인스턴스가 추가한 행을 반영한다. 동기화가 실패하면 sync_every초 동안은
+    시트를 다시 부르지 않는다. 이 프로세스에서 추가한 행은 append 응답의 행 위치로 바로
+    반영한다(write-through). records는 바뀔 때마다 새 목록으로 교체하고 version을 1 올리므로,
+    읽는 쪽은 받은 목록을 그대로 써도 된다.
+    """
+
+    def __init__(self, open_worksheet, sync_every: float = 60.0):
+        self.open_worksheet = open_worksheet
+        self.sync_every     = sync_every
+        self.records   = []
+        self.rows      = 0
+        self.version   = 0
+        self.synced_at = None
+        self.failed_at = None
+        self.error     = None
+        self._sheet    = None
+        self._lock     = threading.RLock()
+
+    def worksheet(self):
+        """열어 둔 워크시트 (처음 한 번만 연다)."""
+        with self._lock:
+            if self._sheet is None:
+                self._sheet = self.open_worksheet()
+            return self._sheet
+
+    def get(self) -> list:
+        """이력 레코드 목록. 마지막 동기화 뒤 sync_every초가 지났으면 새 행만 먼저 읽어 온다.
+
+        마지막 실패 뒤 sync_every초가 지나지 않았으면 시트를 부르지 않고, 받아 둔 이력이 없을 때만
+        그 실패를 다시 올린다.
+        """
+        now = time.monotonic()
+        if self.failed_at is not None and now - self.failed_at < self.sync_every:
+            if self.synced_at is None:
+                raise self.error
+            return self.records
+        if self.synced_at is None or now - self.synced_at >= self.sync_every:
+            self.sync()
+        return self.records
+
+    def sync(self) -> None:
+        with self._lock:
+            try:
+                sheet = self.worksheet()
+                values = sheet.get_all_values() if self.rows == 0 else sheet.get(f"A{self.rows + 1}:B")
+            except Exception as e:
+                self._sheet    = None
+                self.failed_at = time.monotonic()
+                self.error     = e
+                raise
+            self._extend(list(values))
+            self.synced_at = time.monotonic()
+            self.failed_at = None
+            self.error     = None
+
+    def note_append(self, response, rows: list) -> None:
+        """이 프로세스가 추가한 행을 반영.
+
+        추가된 위치 바로 앞까지 알고 있으면 읽지 않고 붙이고, 그 사이에 다른 인스턴스가
+        추가한 행이 있으면 새 행 전체를 읽어 온다.
+        """
+        with self._lock:
+            span = appended_rows(response)
+            if span and span[0] == self.rows + 1 and span[1] - span[0] + 1 == len(rows):
+                self._extend(rows)
+            elif self.synced_at is not None:
+                self.sync()
+
+    def _extend(self, values: list) -> None:
+        if not values:
+            return
+        parsed = [parse_history_row([str(cell) for cell in row]) for row in values]
+        self.records = self.records + [record for record in parsed if record is not None]
+        self.rows   += len(values)
+        self.version += 1
+
+
+# ==========================================
+# [7] 생성 이력 write-behind 저장
+# ==========================================
+class HistoryWriter:
+    """모든 세션의 생성 이력 저장 요청을 모아 백그라운드에서 한 번의 여러 행 append로 보내는 큐.
+
+    submit은 요청을 로컬 저널(journal_path)에 fsync로 기록한 뒤 바로 돌아오므로 생성 버튼이
+    시트 응답을 기다리지 않는다. 스레드는 flush_every초마다, 또는 대기 행이 max_rows개 이상
+    쌓이면 바로 비운다. retries번 모두 실패한 묶음은 fallback_path 로컬 파일에 저장한다.
+    처리가 끝난 요청은 저널에서 지우므로, 프로세스가 죽어도 남은 요청은 다음 시작 때 다시 보낸다.
+    시트 설정이 없으면(cache가 None) 큐를 거치지 않고 바로 로컬 파일에 저장한다.
+    """
+
+    MAX_STATUS = 10_000
+
+    def __init__(
+        self,
+        cache: HistoryCache | None,
+        journal_path: str = "lotto_pending.jsonl",
+        fallback_path: str = "lotto_history.jsonl",
+        flush_every: float = 5.0,
+        max_rows: int = 200,
+        retries: int = 3,
+        retry_delay: float = 1.5,
+    ):
+        self.cache         = cache
+        self.journal_path  = journal_path
+        self.fallback_path = fallback_path
+        self.flush_every   = flush_every
+        self.max_rows      = max_rows
+        self.retries       = retries
+        self.retry_delay   = retry_delay
+        self.last_error    = None
+        self._pending    = []
+        self._status     = OrderedDict()
+        self._lock       = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake       = threading.Event()
+        self._stop       = threading.Event()
+        self._thread     = None
+        self._replay()
+
+    def submit(self, epsd: int, chunks: list) -> list:
+        """압축 게임 묶음들을 저장 요청으로 넣고 요청 id 목록을 돌려준다 (한 묶음이 시트 한 행)."""
+        entries = [{"id": uuid.uuid4().hex, "epsd": int(epsd), "games": chunk} for chunk in chunks]
+        if self.cache is None:
+            self._write_local(entries)
+            with self._lock:
+                self._mark(entries, "local")
+            return [entry["id"] for entry in entries]
+
+        with self._lock:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.extend(entries)
+            self._mark(entries, "pending")
+            if len(self._pending) >= self.max_rows:
+                self._wake.set()
+        return [entry["id"] for entry in entries]
+
+    def status(self, ids: list) -> str | None:
+        """요청들의 저장 상태: 하나라도 남아 있으면 "pending", 하나라도 로컬 저장이면 "local",
+        모두 시트에 들어갔으면 "saved". 모르는 요청뿐이면 None."""
+        with self._lock:
+            states = {self._status.get(i) for i in ids} - {None}
+        for state in ("pending", "local", "saved"):
+            if state in states:
+                return state
+        return None
+
+    def start(self) -> "HistoryWriter":
+        if self.cache is not None and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """스레드를 멈추고 남은 요청을 마지막으로 한 번 비운다."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def flush(self) -> int:
+        """대기 중인 요청 전체를 한 번의 append로 보내고 처리한 요청 수를 돌려준다."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+
+            rows  = [[entry["epsd"], entry["games"]] for entry in batch]
+            state = "local"
+            for attempt in range(1, self.retries + 1):
+                try:
+                    response = self.cache.worksheet().append_rows(rows)
+                    verify_append(response, rows)
+                    state = "saved"
+                    break
+                except Exception as e:
+                    self.last_error = e
+                    if attempt < self.retries:
+                        time.sleep(self.retry_delay)
+
+            if state == "saved":
+                # 캐시 반영 실패는 다음 동기화 때 따라잡으므로 다시 append하지 않는다
+                try:
+                    self.cache.note_append(response, rows)
+                except Exception as e:
+                    self.last_error = e
+            else:
+                self._write_local(batch)
+
+            done = {entry["id"] for entry in batch}
+            with self._lock:
+                self._pending = [entry for entry in self._pending if entry["id"] not in done]
+                self._rewrite_journal()
+                self._mark(batch, state)
+            return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_every)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def _mark(self, entries: list, state: str) -> None:
+        for entry in entries:
+            self._status[entry["id"]] = state
+            self._status.move_to_end(entry["id"])
+        while len(self._status) > self.MAX_STATUS:
+            self._status.popitem(last=False)
+
+    def _write_local(self, entries: list) -> None:
+        with open(self.fallback_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps({"epsd": entry["epsd"], "games": entry["games"]}) + "\n")
+
+    def _rewrite_journal(self) -> None:
+        """남은 요청만으로 저널을 다시 쓴다 (임시 파일에 쓴 뒤 교체)."""
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _replay(self) -> None:
+        """지난 실행에서 보내지 못하고 저널에 남은 요청을 다시 큐에 넣는다."""
+        if not os.path.exists(self.journal_path):
+            return
+        entries = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entries.append({"id": entry["id"], "epsd": int(entry["epsd"]), "games": entry["games"]})
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if self.cache is None:
+            self._write_local(entries)
+            self._mark(entries, "local")
+            os.remove(self.journal_path)
+            return
+        self._pending = entries
+        self._mark(entries, "pending")
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pytest
+
+from lotto_engine import (
+    TICKET_CODEC_PREFIX, TOTAL_COMBINATIONS, decode_tickets, encode_tickets, rank_tickets, unrank_tickets,
+)
+from lotto_store import parse_history_row
+
+
+EDGE_TICKETS = [
+    [1, 2, 3, 4, 5, 6],
+    [1, 2, 3, 4, 5, 7],
+    [7, 13, 22, 31, 38, 44],
+    [40, 41, 42, 43, 44, 45],
+]
+
+
+def test_rank_matches_lexicographic_order():
+    ranks = rank_tickets(EDGE_TICKETS)
+    assert ranks[0] == 0
+    assert ranks[1] == 1
+    assert ranks[-1] == TOTAL_COMBINATIONS - 1
+    assert (np.diff(ranks.astype(np.int64)) > 0).all()
+
+
+def test_rank_unrank_round_trip():
+    ranks = np.random.default_rng(0).integers(0, TOTAL_COMBINATIONS, 10_000).astype(np.uint32)
+    tickets = unrank_tickets(ranks)
+    assert (np.diff(tickets.astype(np.int64), axis=1) > 0).all()
+    assert np.array_equal(rank_tickets(tickets), ranks)
+    assert unrank_tickets(rank_tickets(EDGE_TICKETS)).tolist() == EDGE_TICKETS
+
+
+def test_rank_rejects_invalid_tickets():
+    for ticket in ([0, 2, 3, 4, 5, 6], [1, 2, 3, 4, 5, 46], [1, 1, 3, 4, 5, 6], [6, 5, 4, 3, 2, 1]):
+        with pytest.raises(ValueError):
+            rank_tickets([ticket])
+    with pytest.raises(ValueError):
+        unrank_tickets([TOTAL_COMBINATIONS])
+
+
+def test_encode_decode_round_trip():
+    ranks = rank_tickets(EDGE_TICKETS)
+    encoded = encode_tickets(ranks)
+    assert encoded.startswith(TICKET_CODEC_PREFIX)
+    assert len(encoded) == len(TICKET_CODEC_PREFIX) + 4 * len(ranks)
+    assert np.array_equal(decode_tickets(encoded), ranks)
+    assert len(decode_tickets(encode_tickets(np.zeros(0, dtype=np.uint32)))) == 0
+
+
+def test_decode_reads_legacy_json_cells():
+    games = [[44, 7, 31, 13, 38, 22], [1, 2, 3, 4, 5, 6]]
+    expected = rank_tickets([sorted(game) for game in games])
+    assert np.array_equal(decode_tickets(json.dumps(games)), expected)
+    assert np.array_equal(decode_tickets(games), expected)
+
+
+def test_decode_rejects_out_of_range_ranks():
+    with pytest.raises(ValueError):
+        decode_tickets(TICKET_CODEC_PREFIX + "9CQA")
+    assert parse_history_row(["1000", TICKET_CODEC_PREFIX + "9CQA"]) is None
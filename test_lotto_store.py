@@ -0,0 +1,192 @@
+import gzip
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+import lotto_store
+from lotto_store import DrawStore, HistoryCache, HttpClient
+
+
+def make_draw(epsd: int) -> dict:
+    *numbers, bonus = random.Random(epsd).sample(range(1, 46), 7)
+    numbers = sorted(numbers)
+    return {"ltEpsd": epsd, **{f"tm{i}WnNo": n for i, n in enumerate(numbers, 1)}, "bnusNo": bonus}
+
+
+def json_body(data) -> bytes:
+    return json.dumps(data).encode()
+
+
+class ScriptedServer:
+    """미리 넣어 둔 (상태 코드, 헤더, 본문) 응답을 차례로 돌려주고 받은 요청 헤더를 기록하는 서버.
+
+    하위 클래스는 respond를 바꿔 요청 경로에 따라 답할 수 있다.
+    """
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.headers   = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.headers.append(dict(self.headers))
+                status, headers, body = stub.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def respond(self, path: str) -> tuple:
+        return self.responses.pop(0)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubApi(ScriptedServer):
+    """당첨 결과 API 흉내: srchLtEpsd=all이면 전체, 회차 번호면 그 회차만 돌려주고 요청을 기록."""
+
+    def __init__(self, latest: int):
+        self.draws    = [make_draw(epsd) for epsd in range(1, latest + 1)]
+        self.requests = []
+        super().__init__()
+
+    def respond(self, path: str) -> tuple:
+        epsd = parse_qs(urlsplit(path).query).get("srchLtEpsd", ["all"])[0]
+        self.requests.append(epsd)
+        items = self.draws if epsd == "all" else [d for d in self.draws if d["ltEpsd"] == int(epsd)]
+        return 200, {"Content-Type": "application/json"}, json_body({"data": {"list": items}})
+
+
+@pytest.fixture
+def serve():
+    """서버를 띄워 돌려주고 테스트가 끝나면 모두 닫는다."""
+    servers = []
+
+    def start(server: ScriptedServer) -> ScriptedServer:
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def stub_api(serve, monkeypatch):
+    api = serve(StubApi(latest=30))
+    monkeypatch.setattr(lotto_store, "DRAW_LIST_URL", api.url + "/lt645/selectPstLt645Info.do?srchLtEpsd={epsd}")
+    return api
+
+
+@pytest.fixture
+def scripted_server(serve):
+    return lambda *responses: serve(ScriptedServer(responses))
+
+
+def test_draw_store_fetches_everything_on_first_run(stub_api, tmp_path):
+    store = DrawStore(str(tmp_path / "draws.npy"))
+
+    assert store.refresh() == 30
+    assert stub_api.requests == ["all"]
+    assert store.latest == 30
+
+
+def test_draw_store_fetches_only_new_episodes(stub_api, tmp_path):
+    path = str(tmp_path / "draws.npy")
+    stub_api.draws = stub_api.draws[:27]
+    DrawStore(path).refresh()
+
+    stub_api.draws    = [make_draw(epsd) for epsd in range(1, 31)]
+    stub_api.requests = []
+    store = DrawStore(path)
+    assert store.latest == 27
+
+    assert store.refresh() == 3
+    # 새 회차 28~30만 묻고, 아직 없는 31회에서 멈춘다
+    assert stub_api.requests == ["28", "29", "30", "31"]
+    assert store.rows[:, 0].tolist() == list(range(1, 31))
+    assert np.array_equal(DrawStore(path).rows, store.rows)
+
+    stub_api.requests = []
+    assert store.refresh() == 0
+    assert stub_api.requests == ["31"]
+
+
+def test_http_client_retries_after_503(scripted_server):
+    server = scripted_server(
+        (503, {}, b"busy"),
+        (503, {}, b"busy"),
+        (200, {"Content-Type": "application/json"}, json_body({"ok": True})),
+    )
+    assert HttpClient(retries=3, backoff=0).get_json(server.url) == {"ok": True}
+    assert len(server.headers) == 3
+
+
+def test_http_client_reuses_cached_body_on_304(scripted_server):
+    server = scripted_server(
+        (200, {"ETag": '"v1"', "Last-Modified": "Sat, 03 Oct 2026 12:00:00 GMT"}, json_body({"list": [1, 2]})),
+        (304, {"ETag": '"v1"'}, b""),
+    )
+    client = HttpClient(backoff=0)
+
+    assert client.get_json(server.url) == {"list": [1, 2]}
+    assert client.get_json(server.url) == {"list": [1, 2]}
+    assert "If-None-Match" not in server.headers[0]
+    assert server.headers[1]["If-None-Match"] == '"v1"'
+    assert server.headers[1]["If-Modified-Since"] == "Sat, 03 Oct 2026 12:00:00 GMT"
+
+
+def test_http_client_decodes_gzip(scripted_server):
+    server = scripted_server(
+        (200, {"Content-Encoding": "gzip"}, gzip.compress(json_body({"data": {"list": ["gz"]}}))),
+    )
+    assert HttpClient(backoff=0).get_json(server.url) == {"data": {"list": ["gz"]}}
+    assert "gzip" in server.headers[0]["Accept-Encoding"]
+
+
+class FlakySheet:
+    """처음 fail번은 예외를 내고 그 뒤로는 rows를 돌려주는 워크시트, 호출 수를 기록."""
+
+    def __init__(self, rows: list, fail: int):
+        self.rows  = rows
+        self.fail  = fail
+        self.calls = 0
+
+    def get_all_values(self):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise ConnectionError("sheet down")
+        return self.rows
+
+
+def test_history_cache_waits_after_failed_sync(monkeypatch):
+    now   = [1000.0]
+    sheet = FlakySheet([["1000", json.dumps([[1, 2, 3, 4, 5, 6]])]], fail=1)
+    monkeypatch.setattr(lotto_store.time, "monotonic", lambda: now[0])
+    cache = HistoryCache(lambda: sheet, sync_every=60)
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            cache.get()
+    assert sheet.calls == 1
+
+    now[0] += 60
+    assert [record["epsd"] for record in cache.get()] == [1000]
+    assert sheet.calls == 2